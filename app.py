@@ -18,11 +18,13 @@ import tempfile
 from datetime import datetime
 from pathlib import Path
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import time
 import traceback
-import base64
+import hashlib
+import zipfile
 from io import BytesIO
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Add project root to path
 project_root = Path(__file__).parent
@@ -36,6 +38,12 @@ try:
     from src.core.html_report import build_html_report
     from src.core.word_report import build_detailed_docx
     from src.core.docx_utils import insert_comments_and_return_bytes
+    from src.core import metrics
+    from src.core.cache import content_hash, rules_version
+    from src.core.downloads import DownloadStore
+    from src.rag.ingest import start_background
+    # Keep the reference indexes in step with references/ (one thread per process)
+    start_background()
 except ImportError as e:
     st.error(f"❌ Import error: {e}")
 
@@ -596,16 +604,97 @@ def create_navigation():
 
 # Function definitions complete - navigation will be called in main()
 
-def create_download_link(data, filename, mime_type, button_text):
-    """Create a download link for any file type"""
-    if isinstance(data, str):
-        data = data.encode()
-    
-    b64 = base64.b64encode(data).decode()
-    href = f'<a href="data:{mime_type};base64,{b64}" download="{filename}" style="text-decoration: none;">'
-    href += f'<div class="modern-button" style="display: inline-block; margin: 0.5rem;">{button_text}</div>'
-    href += '</a>'
-    return href
+def bundle_key(file_bytes: Dict[str, bytes]) -> str:
+    """Digest of the upload names and contents and the rules version; equal bundles share cached results"""
+    h = hashlib.sha256(rules_version().encode())
+    for name in sorted(file_bytes):
+        h.update(f"{name}\0{content_hash(file_bytes[name])}\n".encode())
+    return h.hexdigest()[:32]
+
+@st.cache_resource(show_spinner=False)
+def download_store() -> DownloadStore:
+    """Per-session temp files behind the download buttons (ADGM_DOWNLOAD_DIR, ADGM_DOWNLOAD_TTL)"""
+    return DownloadStore()
+
+def session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+def commented_files(results: Dict[str, Any]) -> List[str]:
+    """Uploads that can be returned with review comments"""
+    return [name for name in results["process_analysis"].get("parsed", {}) if name.endswith('.docx')]
+
+def analysis_json(results: Dict[str, Any]) -> str:
+    report_data = {
+        "analysis_timestamp": (results.get("analyzed_at") or datetime.now()).isoformat(),
+        "process_analysis": {k: v for k, v in results["process_analysis"].items() if k != "parsed"},
+        "validation_results": results["validation_results"],
+        "risk_assessment": {
+            "level": results["risk_level"],
+            "score": results["compliance_score"]
+        }
+    }
+    return json.dumps(report_data, indent=2)
+
+def build_package(results: Dict[str, Any]) -> bytes:
+    """ZIP of the three reports and every commented document"""
+    out = BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ADGM_Executive_Report.pdf", artifact_bytes(results, "report.pdf"))
+        zf.writestr("ADGM_Detailed_Report.docx", artifact_bytes(results, "report.docx"))
+        zf.writestr("ADGM_Interactive_Report.html", artifact_bytes(results, "report.html"))
+        for filename in commented_files(results):
+            zf.writestr(f"commented/{filename}", artifact_bytes(results, f"commented/{filename}"))
+    return out.getvalue()
+
+def produce_artifact(results: Dict[str, Any], name: str) -> Union[bytes, str]:
+    """Build a named artifact of an analysis; only runs when the download store does not have it yet"""
+    validation_results = results["validation_results"]
+    if name == "report.html":
+        return build_html_report(validation_results)
+    if name == "report.pdf":
+        return build_summary_pdf(validation_results)
+    if name == "report.docx":
+        return build_detailed_docx(validation_results)
+    if name == "analysis.json":
+        return analysis_json(results)
+    if name == "package.zip":
+        return build_package(results)
+    if name.startswith("commented/"):
+        filename = name[len("commented/"):]
+        doc_issues = [issue for issue in validation_results.get("issues_found", []) if issue.get('document') == filename]
+        return insert_comments_and_return_bytes(results["process_analysis"]["parsed"][filename], doc_issues)
+    raise KeyError(f"Unknown artifact {name!r}")
+
+def artifact_bytes(results: Dict[str, Any], name: str) -> bytes:
+    """A named artifact, built on first request and read back from this session's download store after that"""
+    return download_store().read(session_id(), results.get("bundle_key") or "unkeyed", name,
+                                 lambda: produce_artifact(results, name))
+
+def download_artifact(results: Dict[str, Any], name: str, filename: str, mime_type: str, label: str):
+    """A download button for a named artifact of an analysis
+
+    Nothing is built until asked for: an artifact not produced yet shows a prepare
+    button first. Once built it is kept in a temp file, and the download button hands
+    the browser a media URL instead of inlining the payload as base64.
+    """
+    store, session = download_store(), session_id()
+    bundle = results.get("bundle_key") or "unkeyed"
+    if not store.has(session, bundle, name):
+        if not st.button(f"⚙️ Prepare {filename}", key=f"prepare_{name}", use_container_width=True):
+            return
+        try:
+            with st.spinner(f"Preparing {filename}..."):
+                artifact_bytes(results, name)
+        except Exception as e:
+            st.warning(f"Could not prepare {filename}: {str(e)}")
+            return
+    st.download_button(label, data=artifact_bytes(results, name), file_name=filename, mime=mime_type,
+                       key=f"download_{name}", use_container_width=True)
+
+def result_stamp(results: Dict[str, Any]) -> str:
+    """Timestamp for download file names; fixed per analysis so reruns send identical markup"""
+    return (results.get("analyzed_at") or datetime.now()).strftime('%Y%m%d_%H%M%S')
 
 def render_beautiful_header():
     """Render the beautiful hero header"""
@@ -683,26 +772,58 @@ def render_beautiful_sidebar():
             for key in list(st.session_state.keys()):
                 if key.startswith('analysis_') or key.startswith('results_'):
                     del st.session_state[key]
+            download_store().remove(session_id())
             st.rerun()
 
-def show_beautiful_workflow(current_step: str = "ready"):
-    """Show beautiful analysis workflow"""
-    st.markdown("### 🔄 Analysis Workflow")
+        render_metrics_summary()
+
+def render_metrics_summary():
+    """Where analysis time has gone in this server process, slowest stage first"""
+    st.markdown("---")
+    st.markdown("### ⏱️ Pipeline Metrics")
+    if not metrics.ENABLED:
+        st.caption("Metrics are disabled (ADGM_METRICS=0).")
+        return
+    rows = metrics.summary()
+    if not rows:
+        st.caption("No analyses yet in this server process.")
+        return
+    st.dataframe(
+        [{"Stage": r["stage"], "Calls": r["calls"], "Total s": r["total_s"], "Mean ms": r["mean_ms"]} for r in rows],
+        hide_index=True, use_container_width=True,
+    )
+    st.caption("Totals since the server started; nested stages (e.g. extract within classify) overlap.")
+
+WORKFLOW_STEPS = [
+    ("📁", "Document Intake", "Reading uploads", "intake"),
+    ("🤖", "AI Classification", "detect_process_and_types()", "classify"),
+    ("📋", "Compliance Check", "analyze_bundle()", "compliance"),
+    ("📊", "Report Generation", "Multi-format reports", "report"),
+    ("📝", "Document Commenting", "insert_comments_and_return_bytes()", "comment")
+]
+# Built when first downloaded rather than during the analysis
+ON_DEMAND_STEPS = {"report", "comment"}
+
+def show_beautiful_workflow(current_step: str = "ready", timings: Dict[str, float] = None):
+    """Show beautiful analysis workflow
     
-    steps = [
-        ("📁", "Document Intake", "Processing files", "intake"),
-        ("🤖", "AI Classification", "identify_doc_type()", "classify"),
-        ("⚖️", "Process Detection", "detect_process_and_types()", "process"),
-        ("📋", "Compliance Check", "analyze_bundle()", "compliance"),
-        ("📊", "Report Generation", "Multi-format reports", "report")
-    ]
+    `timings` maps completed stage keys to their measured duration in seconds.
+    """
+    st.markdown("### 🔄 Analysis Workflow")
+    timings = timings or {}
     
     st.markdown('<div class="progress-container">', unsafe_allow_html=True)
     
-    for icon, name, desc, step in steps:
-        if current_step == step:
+    for icon, name, desc, step in WORKFLOW_STEPS:
+        if step in timings:
+            css_class = "progress-complete"
+            status = f"✅ Complete · {timings[step]:.2f}s"
+        elif current_step == step:
             css_class = "progress-active"
             status = "🔄 Processing..."
+        elif step in ON_DEMAND_STEPS:
+            css_class = "progress-pending"
+            status = "📥 On demand - built when first downloaded"
         elif current_step == "complete":
             css_class = "progress-complete"
             status = "✅ Complete"
@@ -830,87 +951,49 @@ def beautiful_document_upload():
     return None
 
 def perform_beautiful_analysis(uploaded_files):
-    """Perform analysis with beautiful progress tracking"""
+    """Perform analysis with beautiful progress tracking
+    
+    Progress advances as each stage actually completes, and the measured
+    duration of every stage is returned under "stage_timings". Reports and
+    commented documents are not built here: each is produced on first request
+    (see `download_artifact`), so the results appear as soon as validation ends.
+    """
     
     progress_placeholder = st.empty()
+    timings: Dict[str, float] = {}
     
-    with progress_placeholder.container():
-        show_beautiful_workflow("intake")
-        st.info("🔄 Initializing beautiful analysis engine...")
+    def run_stage(step, message, fn, *args):
+        with progress_placeholder.container():
+            show_beautiful_workflow(step, timings)
+            st.info(message)
+        started = time.perf_counter()
+        output = fn(*args)
+        timings[step] = time.perf_counter() - started
+        return output
     
     try:
-        # Step 1: File Processing
-        with progress_placeholder.container():
-            show_beautiful_workflow("classify")
-            st.info("🤖 Running AI classification with real functions...")
-        
-        file_bytes = {}
-        for file in uploaded_files:
-            file_content = file.read()
-            file_bytes[file.name] = file_content
-        
-        time.sleep(1.5)
-        
-        # Step 2: Process Detection
-        with progress_placeholder.container():
-            show_beautiful_workflow("process")
-            st.info("⚖️ Detecting legal process using detect_process_and_types()...")
+        # Step 1: Intake - read each upload once; the parsed documents are reused downstream
+        file_bytes = run_stage(
+            "intake", "📁 Reading uploaded documents...",
+            lambda: {file.name: file.getvalue() for file in uploaded_files}
+        )
+        key = bundle_key(file_bytes)
         
-        process_analysis = detect_process_and_types(file_bytes)
+        # Step 2: Classification & Process Detection
+        process_analysis = run_stage(
+            "classify", "🤖 Classifying documents using detect_process_and_types()...",
+            detect_process_and_types, file_bytes
+        )
         st.success(f"✅ Process identified: {process_analysis.get('process', 'Unknown')}")
         
-        time.sleep(1.5)
-        
         # Step 3: Compliance Analysis
-        with progress_placeholder.container():
-            show_beautiful_workflow("compliance")
-            st.info("📋 Running comprehensive compliance analysis...")
-        
-        validation_results = analyze_bundle(process_analysis)
+        validation_results = run_stage(
+            "compliance", "📋 Running comprehensive compliance analysis...",
+            analyze_bundle, process_analysis
+        )
         compliance_score = validation_results.get("compliance_score", 0)
         st.success(f"✅ Compliance score calculated: {compliance_score}%")
         
-        time.sleep(1.5)
-        
-        # Step 4: Report Generation
-        with progress_placeholder.container():
-            show_beautiful_workflow("report")
-            st.info("📊 Generating beautiful reports in multiple formats...")
-        
-        # Generate all report formats
-        html_report = build_html_report(validation_results)
-        pdf_report = build_summary_pdf(validation_results)
-        
-        # Generate DOCX with comments for each uploaded file
-        commented_docs = {}
-        issues = validation_results.get("issues_found", [])
-        
-        for file in uploaded_files:
-            if file.name.endswith('.docx'):
-                try:
-                    # Get issues for this specific document
-                    doc_issues = [issue for issue in issues if issue.get('document') == file.name]
-                    
-                    # Create comments for DOCX
-                    comments = []
-                    for issue in doc_issues:
-                        comments.append({
-                            'text': issue.get('suggestion', 'Review this section'),
-                            'author': 'ADGM Agent Pro',
-                            'comment': f"[{issue.get('severity', 'Medium')}] {issue.get('issue', 'Compliance issue detected')}"
-                        })
-                    
-                    # Reset file pointer
-                    file.seek(0)
-                    file_content = file.read()
-                    
-                    # Insert comments and get updated DOCX
-                    commented_docx = insert_comments_and_return_bytes(file_content, comments)
-                    commented_docs[file.name] = commented_docx
-                    
-                except Exception as e:
-                    st.warning(f"Could not add comments to {file.name}: {str(e)}")
-        
         # Calculate risk level
         if compliance_score >= 80:
             risk_level = "Low"
@@ -922,16 +1005,16 @@ def perform_beautiful_analysis(uploaded_files):
         results = {
             "process_analysis": process_analysis,
             "validation_results": validation_results,
-            "html_report": html_report,
-            "pdf_report": pdf_report,
-            "commented_docs": commented_docs,
             "risk_level": risk_level,
-            "compliance_score": compliance_score
+            "compliance_score": compliance_score,
+            "stage_timings": timings,
+            "bundle_key": key,
+            "analyzed_at": datetime.now()
         }
         
         with progress_placeholder.container():
-            show_beautiful_workflow("complete")
-            st.success("✅ Beautiful analysis complete with all reports generated!")
+            show_beautiful_workflow("complete", timings)
+            st.success("✅ Beautiful analysis complete! Reports and commented documents are prepared when you download them.")
         
         return results
         
@@ -1000,6 +1083,13 @@ def display_beautiful_results(results):
     
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # Measured stage latency
+    stage_timings = results.get("stage_timings") or {}
+    if stage_timings:
+        names = {step: name for _, name, _, step in WORKFLOW_STEPS}
+        summary = " • ".join(f"{names.get(step, step)}: {secs:.2f}s" for step, secs in stage_timings.items())
+        st.caption(f"⏱️ Total {sum(stage_timings.values()):.2f}s — {summary}")
+    
     # Beautiful Document Analysis
     st.markdown("---")
     st.markdown("## 📋 Document Analysis Results")
@@ -1191,23 +1281,9 @@ def display_beautiful_results(results):
     """, unsafe_allow_html=True)
     
     # Create JSON download
-    report_data = {
-        "analysis_timestamp": datetime.now().isoformat(),
-        "process_analysis": process_analysis,
-        "validation_results": validation_results,
-        "risk_assessment": {
-            "level": results["risk_level"],
-            "score": results["compliance_score"]
-        }
-    }
-    
-    json_data = json.dumps(report_data, indent=2)
-    json_filename = f"ADGM_Analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    
-    st.markdown(
-        create_download_link(json_data, json_filename, "application/json", "💾 Download JSON Report"),
-        unsafe_allow_html=True
-    )
+    stamp = result_stamp(results)
+    download_artifact(results, "analysis.json", f"ADGM_Analysis_{stamp}.json",
+                      "application/json", "💾 Download JSON Report")
     
     # PDF Report
     st.markdown("""
@@ -1219,15 +1295,11 @@ def display_beautiful_results(results):
     """, unsafe_allow_html=True)
     
     # Create PDF download
-    pdf_filename = f"ADGM_Executive_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    st.markdown(
-        create_download_link(results["pdf_report"], pdf_filename, "application/pdf", "💾 Download PDF Report"),
-        unsafe_allow_html=True
-    )
+    download_artifact(results, "report.pdf", f"ADGM_Executive_Report_{stamp}.pdf",
+                      "application/pdf", "💾 Download PDF Report")
     
     # DOCX with Comments
-    if results.get("commented_docs"):
+    if commented_files(results):
         st.markdown("""
         <div class="download-card download-docx">
             <div style="font-size: 3rem; margin-bottom: 1rem;">📝</div>
@@ -1236,13 +1308,11 @@ def display_beautiful_results(results):
         </div>
         """, unsafe_allow_html=True)
         
-        for filename, docx_data in results["commented_docs"].items():
-            commented_filename = f"Commented_{filename.replace('.docx', '')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-            
-            st.markdown(
-                create_download_link(docx_data, commented_filename, "application/vnd.openxmlformats-officedocument.wordprocessingml.document", f"💾 Download {filename}"),
-                unsafe_allow_html=True
-            )
+        for filename in commented_files(results):
+            commented_filename = f"Commented_{filename.replace('.docx', '')}_{stamp}.docx"
+            download_artifact(results, f"commented/{filename}", commented_filename,
+                              "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                              f"💾 Download {filename}")
     
     # HTML Report
     st.markdown("""
@@ -1254,19 +1324,15 @@ def display_beautiful_results(results):
     """, unsafe_allow_html=True)
     
     # Create HTML download
-    html_filename = f"ADGM_Interactive_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    
-    st.markdown(
-        create_download_link(results["html_report"], html_filename, "text/html", "💾 Download HTML Report"),
-        unsafe_allow_html=True
-    )
+    download_artifact(results, "report.html", f"ADGM_Interactive_Report_{stamp}.html",
+                      "text/html", "💾 Download HTML Report")
     
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Show HTML report preview
-    if results.get("html_report"):
-        st.markdown("### 📋 Interactive Report Preview")
-        st.components.v1.html(results["html_report"], height=500, scrolling=True)
+    # Show HTML report preview (built on request, like the downloads)
+    st.markdown("### 📋 Interactive Report Preview")
+    if st.toggle("Show interactive report", key="show_html_preview"):
+        st.components.v1.html(artifact_bytes(results, "report.html").decode("utf-8"), height=500, scrolling=True)
 
 def page_analysis():
     """Document Analysis Page"""
@@ -1282,6 +1348,12 @@ def page_analysis():
     uploaded_files = beautiful_document_upload()
     
     if uploaded_files:
+        # Reruns keep the uploads; the same bundle under the same rules is not analyzed again
+        current = st.session_state.get('analysis_results')
+        if current and current.get("bundle_key") == bundle_key({file.name: file.getvalue() for file in uploaded_files}):
+            st.success("✅ These documents are already analyzed - see the Results, Reports and Dashboard pages.")
+            return
+        
         with st.spinner("🎨 Running enhanced AI analysis..."):
             results = perform_beautiful_analysis(uploaded_files)
             
@@ -1343,6 +1415,7 @@ def page_reports():
     
     if st.session_state.get('analysis_complete') and st.session_state.get('analysis_results'):
         results = st.session_state['analysis_results']
+        stamp = result_stamp(results)
         
         st.markdown("""
         <div class="beautiful-card">
@@ -1362,14 +1435,8 @@ def page_reports():
             </div>
             """, unsafe_allow_html=True)
             
-            if results.get("summary_pdf"):
-                st.download_button(
-                    "📄 Download PDF",
-                    data=results["summary_pdf"],
-                    file_name=f"ADGM_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            download_artifact(results, "report.pdf", f"ADGM_Summary_{stamp}.pdf",
+                              "application/pdf", "📄 Download PDF")
         
         with col2:
             st.markdown("""
@@ -1380,14 +1447,9 @@ def page_reports():
             </div>
             """, unsafe_allow_html=True)
             
-            if results.get("detailed_docx"):
-                st.download_button(
-                    "📋 Download DOCX",
-                    data=results["detailed_docx"],
-                    file_name=f"ADGM_Detailed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    use_container_width=True
-                )
+            download_artifact(results, "report.docx", f"ADGM_Detailed_{stamp}.docx",
+                              "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                              "📋 Download DOCX")
         
         with col3:
             st.markdown("""
@@ -1398,14 +1460,8 @@ def page_reports():
             </div>
             """, unsafe_allow_html=True)
             
-            if results.get("zip_package"):
-                st.download_button(
-                    "📦 Download ZIP",
-                    data=results["zip_package"],
-                    file_name=f"ADGM_Package_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                    mime="application/zip",
-                    use_container_width=True
-                )
+            download_artifact(results, "package.zip", f"ADGM_Package_{stamp}.zip",
+                              "application/zip", "📦 Download ZIP")
     else:
         st.markdown("""
         <div class="beautiful-card" style="text-align: center;">
@@ -0,0 +1,281 @@
+"""
+Analysis Pipeline Benchmark
+===========================
+
+Times every stage of the bundle pipeline on synthetic DOCX bundles grown from
+the `references/*.docx` templates, from one-page documents to hundreds of
+pages and from a single document to fifty:
+
+    extract    parse_docx for every upload
+    classify   detect_process_and_types on the parsed documents
+    validate   analyze_bundle (per-document checks, cross-document checks, score)
+    cross_doc  cross_document_issues alone (also part of validate)
+    report     render_report in every format
+    comment    insert_comments_and_return_bytes for every document with issues
+
+The analysis cache is bypassed, so every run measures the cold pipeline. Each
+stage's time is the median of --repeat runs; a final run records each stage's
+peak Python heap allocation (tracemalloc) and, on Linux, its peak resident
+memory, which also covers the lxml trees tracemalloc cannot see. Results are
+written as JSON (-o) and a previous file can be passed to --compare to print
+per-stage ratios.
+
+Usage:
+    python benchmarks/bench_pipeline.py --pages 1 10 100 --docs 1 10 50 -o bench.json
+    python benchmarks/bench_pipeline.py --pages 300 --docs 5 --compare bench.json
+"""
+
+import argparse
+import copy
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from src.core.cache import rules_version
+from src.core.classify import detect_process_and_types
+from src.core.docx_utils import insert_comments_and_return_bytes, parse_docx
+from src.core.report import REPORT_FORMATS, render_report
+from src.core.validate import analyze_bundle, cross_document_issues
+from src.rag.simple_retriever import REF_DIR
+
+STAGES = ("extract", "classify", "validate", "cross_doc", "report", "comment")
+# Roughly a page of contract text
+WORDS_PER_PAGE = 500
+
+
+def templates():
+    names = sorted(f for f in os.listdir(REF_DIR) if f.lower().endswith(".docx"))
+    if not names:
+        sys.exit(f"No .docx templates in {REF_DIR}")
+    out = []
+    for name in names:
+        with open(os.path.join(REF_DIR, name), "rb") as f:
+            out.append((name, f.read()))
+    return out
+
+
+def grow_document(template, pages):
+    """The template's body blocks repeated (or cut) to about `pages` pages, styles and section kept."""
+    doc = Document(io.BytesIO(template))
+    body = doc.element.body
+    blocks = [el for el in body if not el.tag.endswith("}sectPr")]
+    for el in blocks:
+        body.remove(el)
+    sect = body[0] if len(body) else None
+    target = pages * WORDS_PER_PAGE
+    words = 0
+    i = 0
+    while words < target and blocks:
+        el = copy.deepcopy(blocks[i % len(blocks)])
+        words += len("".join(el.itertext()).split())
+        if sect is not None:
+            sect.addprevious(el)
+        else:
+            body.append(el)
+        i += 1
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+class BundleFactory:
+    """Synthetic bundles of `docs` documents x `pages` pages, cycling through the templates."""
+
+    def __init__(self):
+        self.templates = templates()
+        self._grown = {}
+
+    def document(self, t, pages):
+        if (t, pages) not in self._grown:
+            self._grown[(t, pages)] = grow_document(self.templates[t][1], pages)
+        return self._grown[(t, pages)]
+
+    def bundle(self, docs, pages):
+        files = {}
+        for i in range(docs):
+            t = i % len(self.templates)
+            files[f"{i + 1:02d}_{self.templates[t][0]}"] = self.document(t, pages)
+        return files
+
+
+def _status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS mark (Linux) and return the current RSS in MB, or None if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return None
+    return _status_mb("VmRSS:")
+
+
+def peak_rss_mb():
+    return _status_mb("VmHWM:")
+
+
+def max_rss_mb():
+    """Peak RSS of the whole run in MB (Linux), or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_pipeline(files, workers, clock):
+    """Run the pipeline once; `clock(stage, fn, *args)` runs and measures each stage."""
+    parsed = clock("extract", lambda: {name: parse_docx(data) for name, data in files.items()})
+    proc_info = clock("classify", detect_process_and_types, parsed, False, workers)
+    report = clock("validate", analyze_bundle, proc_info, False, workers)
+    clock("cross_doc", cross_document_issues, proc_info["documents"])
+    clock("report", lambda: [render_report(fmt, report) for fmt in REPORT_FORMATS])
+
+    by_doc = {}
+    for issue in report["issues_found"]:
+        if issue.get("document") in proc_info["parsed"]:
+            by_doc.setdefault(issue["document"], []).append(issue)
+    clock("comment", lambda: [insert_comments_and_return_bytes(proc_info["parsed"][name], issues)
+                              for name, issues in by_doc.items()])
+    return proc_info, report
+
+
+def measure(files, workers, repeat):
+    timings = {stage: [] for stage in STAGES}
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        timings[stage].append(time.perf_counter() - t0)
+        return out
+
+    for _ in range(repeat):
+        proc_info, report = run_pipeline(files, workers, timed)
+
+    heap, rss = {}, {}
+
+    def traced(stage, fn, *args):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        rss_base = reset_peak_rss()
+        out = fn(*args)
+        heap[stage] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        if rss_base is not None:
+            rss[stage] = peak_rss_mb() - rss_base
+        return out
+
+    tracemalloc.start()
+    try:
+        run_pipeline(files, workers, traced)
+    finally:
+        tracemalloc.stop()
+
+    stages = {stage: {"seconds": round(statistics.median(timings[stage]), 5),
+                      "min_seconds": round(min(timings[stage]), 5),
+                      "peak_mb": round(heap[stage], 2),
+                      "peak_rss_mb": round(rss[stage], 1) if stage in rss else None} for stage in STAGES}
+    return {
+        "process": proc_info["process"],
+        "issues": len(report["issues_found"]),
+        "score": report["compliance_score"],
+        # cross_doc is measured separately but already counted in validate
+        "total_seconds": round(sum(s["seconds"] for k, s in stages.items() if k != "cross_doc"), 5),
+        "stages": stages,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_path):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["pages"], r["documents"]): r for r in json.load(f)["results"]}
+    print(f"\nnew / old seconds (below 1.00 is faster) against {old_path}")
+    print(f"{'pages':>6} {'docs':>5} " + " ".join(f"{s:>9}" for s in STAGES) + f" {'total':>9}")
+    for r in results:
+        base = old.get((r["pages"], r["documents"]))
+        if base is None:
+            continue
+
+        def ratio(new, prev):
+            return f"{new / prev:>9.2f}" if prev else f"{'-':>9}"
+
+        cells = [ratio(r["stages"][s]["seconds"], base["stages"].get(s, {}).get("seconds")) for s in STAGES]
+        print(f"{r['pages']:>6} {r['documents']:>5} " + " ".join(cells)
+              + f" {ratio(r['total_seconds'], base['total_seconds'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100], help='pages per document')
+    parser.add_argument('--docs', type=int, nargs='+', default=[1, 10, 50], help='documents per bundle')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per bundle (median reported)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='classify/validate workers (0 = one per CPU)')
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    factory = BundleFactory()
+    # Compile the rule pack and build the retrieval indexes before anything is timed
+    run_pipeline(factory.bundle(1, 1), args.workers, lambda stage, fn, *a: fn(*a))
+
+    results = []
+    print(f"{'pages':>6} {'docs':>5} {'MB':>7} " + " ".join(f"{s:>9}" for s in STAGES) + f" {'total s':>9} {'peak MB':>8} {'RSS MB':>7}")
+    for pages in args.pages:
+        for docs in args.docs:
+            files = factory.bundle(docs, pages)
+            result = {"pages": pages, "documents": docs, "bytes": sum(len(b) for b in files.values()),
+                      **measure(files, args.workers, args.repeat)}
+            results.append(result)
+            stages = result["stages"]
+            print(f"{pages:>6} {docs:>5} {result['bytes'] / 2**20:>7.1f} "
+                  + " ".join(f"{stages[s]['seconds']:>9.3f}" for s in STAGES)
+                  + f" {result['total_seconds']:>9.3f} {max(s['peak_mb'] for s in stages.values()):>8.1f}"
+                  + f" {max(s['peak_rss_mb'] or 0 for s in stages.values()):>7.1f}")
+
+    meta = {
+        "revision": git_revision(),
+        "rules_version": rules_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "words_per_page": WORDS_PER_PAGE,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+    rss = max_rss_mb()
+    if rss is not None:
+        meta["max_rss_mb"] = rss
+    output = {"meta": meta, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Retriever Scoring Benchmark
+===========================
+
+Compares the original per-document scorer of `simple_retriever.retrieve`
+(which walks the union of query and document vocabularies for every file)
+against the sparse vectorized scoring of `LexicalIndex`, one query at a time
+and batched through `search_many`, on a synthetic reference corpus grown from
+the real `references/*.txt` files.
+
+Usage:
+    python benchmarks/bench_retriever.py --sizes 100 1000 5000 --queries 50
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag.lexical import LexicalIndex, tokenize
+from src.rag.simple_retriever import REF_DIR
+
+QUERIES = [
+    "registered office address in Abu Dhabi Global Market",
+    "governing law ADGM courts jurisdiction",
+    "employment contract minimum salary notice period",
+    "board resolution signature block director",
+    "ultimate beneficial owner declaration",
+    "shareholder written resolution authorised signatory",
+]
+
+
+def reference_vocabulary():
+    words = []
+    for name in sorted(os.listdir(REF_DIR)):
+        if name.endswith('.txt'):
+            with open(os.path.join(REF_DIR, name), 'r', encoding='utf-8', errors='ignore') as f:
+                words.extend(tokenize(f.read()))
+    return words or [q for query in QUERIES for q in tokenize(query)]
+
+
+def synthetic_corpus(n_docs, words, rng, doc_len=(150, 600)):
+    # A long tail of synthetic terms keeps the vocabulary growing with the corpus
+    return [
+        (f"ref_{i:05}.txt", " ".join(
+            rng.choice(words) if rng.random() < 0.8 else f"term{rng.randint(0, n_docs * 5)}"
+            for _ in range(rng.randint(*doc_len))
+        ))
+        for i in range(n_docs)
+    ]
+
+
+def legacy_scores(doc_tfs, dfs, query, k):
+    """The scoring loop `simple_retriever.retrieve` shipped with, minus corpus loading."""
+    q_tokens = tokenize(query)
+    q_tf = Counter(q_tokens)
+    n = len(doc_tfs)
+    scores = []
+    for name, tf in doc_tfs:
+        num = dq = dd = 0.0
+        for term in set(q_tokens + list(tf.keys())):
+            idf = math.log((n + 1) / (1 + dfs.get(term, 0))) + 1.0
+            q_w = q_tf.get(term, 0) * idf
+            d_w = tf.get(term, 0) * idf
+            num += q_w * d_w
+            dq += q_w * q_w
+            dd += d_w * d_w
+        denom = (dq ** 0.5) * (dd ** 0.5)
+        scores.append(((num / denom) if denom else 0.0, name))
+    scores.sort(reverse=True)
+    return [name for _, name in scores[:k]]
+
+
+def run(sizes, n_queries, k, seed):
+    rng = random.Random(seed)
+    words = reference_vocabulary()
+    queries = [rng.choice(QUERIES) if i % 2 else " ".join(rng.sample(words, 4)) for i in range(n_queries)]
+
+    print(f"{'docs':>6} {'terms':>8} {'build s':>8} {'legacy ms/q':>12} {'vector ms/q':>12} "
+          f"{'batch ms/q':>11} {'speedup':>8}  same top-k")
+    for n_docs in sizes:
+        corpus = synthetic_corpus(n_docs, words, rng)
+
+        doc_tfs = [(name, Counter(tokenize(text))) for name, text in corpus]
+        dfs = Counter(term for _, tf in doc_tfs for term in tf)
+
+        index = LexicalIndex()
+        t0 = time.perf_counter()
+        for name, text in corpus:
+            index.add(name, text)
+        index.search("warm up", k)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        legacy = [legacy_scores(doc_tfs, dfs, q, k) for q in queries]
+        legacy_ms = (time.perf_counter() - t0) / n_queries * 1e3
+
+        t0 = time.perf_counter()
+        vector = [[name for _, name in index.search(q, k)] for q in queries]
+        vector_ms = (time.perf_counter() - t0) / n_queries * 1e3
+
+        t0 = time.perf_counter()
+        batch = [[name for _, name in hits] for hits in index.search_many(queries, k)]
+        batch_ms = (time.perf_counter() - t0) / n_queries * 1e3
+
+        print(f"{n_docs:>6} {len(index.postings):>8} {build:>8.2f} {legacy_ms:>12.2f} {vector_ms:>12.3f} "
+              f"{batch_ms:>11.3f} {legacy_ms / vector_ms:>7.0f}x  {legacy == vector == batch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
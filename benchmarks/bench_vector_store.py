@@ -0,0 +1,116 @@
+"""
+Dense Vector Store Benchmark
+============================
+
+Builds the reference passage index as exact float32 ("flat"), int8 scalar
+quantized ("sq8") and product quantized ("pq") FAISS indexes, maps each one
+from disk the way `src.rag.semantic` serves it, and reports size, resident
+memory after loading, query latency and recall@k against the exact index.
+
+Vectors come from the passages of the built dense index (embedded again with
+the configured model) or, with --synthetic, from clustered random unit vectors
+standing in for a larger rulebook.
+
+Usage:
+    python benchmarks/bench_vector_store.py -k 5
+    python benchmarks/bench_vector_store.py --synthetic 50000 --dim 384
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag import semantic
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def reference_vectors():
+    with open(semantic.META_PATH, "r", encoding="utf-8") as f:
+        passages = [text for _, text in json.load(f)["passages"].values()]
+    if semantic.get_model() is None:
+        sys.exit(semantic.model_error())
+    return semantic.encode(passages)
+
+
+def synthetic_vectors(n, dim, rng, clusters=200, latent=32):
+    # Topics as cluster centres and passages varying along a few shared directions,
+    # like sentence embeddings, whose variance sits in a low-dimensional subspace
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    basis = rng.standard_normal((latent, dim)).astype(np.float32)
+    vectors = (centres[rng.integers(0, clusters, n)]
+               + rng.standard_normal((n, latent)).astype(np.float32) @ basis * 0.5
+               + 0.1 * rng.standard_normal((n, dim)).astype(np.float32))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(exact_ids, approx_ids, k):
+    """Mean fraction of each query's exact top-k found in the approximate top-k."""
+    return float(np.mean([len(set(e[:k]) & set(a[:k])) / k for e, a in zip(exact_ids, approx_ids)]))
+
+
+def run(vectors, n_queries, k, rng):
+    import faiss
+    # Held-out passages, lightly perturbed, stand in for paraphrased queries
+    order = rng.permutation(len(vectors))
+    queries = vectors[order[:n_queries]] + 0.05 * rng.standard_normal((n_queries, vectors.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    data = vectors[order[n_queries:]]
+    ids = np.arange(len(data), dtype=np.int64)
+    print(f"{len(data)} vectors x {data.shape[1]} dims, {n_queries} queries, k={k}\n")
+
+    print(f"{'kind':>5} {'index':>16} {'file MB':>8} {'B/vec':>6} {'RSS MB':>7} {'ms/query':>9} {'recall@k':>9}")
+    exact = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in semantic.INDEX_KINDS:
+            index = semantic.new_index(kind, data.shape[1], data)
+            index.add_with_ids(data, ids)
+            path = os.path.join(tmp, f"{kind}.faiss")
+            faiss.write_index(index, path)
+            del index
+
+            before = rss_mb()
+            index, _ = semantic.read_index(path)
+            loaded = rss_mb() - before
+            t0 = time.perf_counter()
+            _, found = index.search(queries, k)
+            ms = (time.perf_counter() - t0) / n_queries * 1e3
+            if exact is None:
+                exact = found
+            size = os.path.getsize(path)
+            spec = type(faiss.downcast_index(index.index)).__name__.replace("Index", "")
+            if spec == "PQ":
+                spec += str(semantic.pq_subquantizers(data.shape[1]))
+            print(f"{kind:>5} {spec:>16} {size / 2**20:>8.1f} {size / len(data):>6.0f} {loaded:>7.1f} "
+                  f"{ms:>9.3f} {recall_at_k(exact, found, k):>9.3f}")
+            del index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=0, help='number of synthetic vectors instead of references/')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_vectors(args.synthetic, args.dim, rng) if args.synthetic else reference_vectors()
+    run(np.ascontiguousarray(vectors, dtype=np.float32), min(args.queries, len(vectors) // 2), args.k, rng)
+
+
+if __name__ == "__main__":
+    main()
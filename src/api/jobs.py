@@ -0,0 +1,203 @@
+"""Background analysis jobs: a bounded queue, a few runners and a pluggable state store.
+
+A job runs a sequence of named stages (classify, validate) in the analysis
+process pool. Its state is kept in a `JobStore`: in-process by default, or
+SQLite (`ADGM_JOB_STORE=sqlite`) so any server process can answer status
+polls. When the queue is full `submit` raises `QueueFull` and the API answers
+429.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from src.core.cache import CACHE_DIR
+
+STORE_ENV = "ADGM_JOB_STORE"
+DB_PATH = os.environ.get("ADGM_JOB_DB") or os.path.join(CACHE_DIR, "jobs.sqlite3")
+QUEUE_SIZE = int(os.environ.get("ADGM_JOB_QUEUE_SIZE", "16"))
+# Finished jobs are forgotten this many seconds after they complete
+JOB_TTL = float(os.environ.get("ADGM_JOB_TTL", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+Stage = Tuple[str, Callable[[Any], Any]]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobStore(ABC):
+    """Job records: id, status, stage, created, updated, result and error."""
+
+    @abstractmethod
+    def create(self, job_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def prune(self, before: float) -> None:
+        """Drop finished jobs last updated before `before` (a time.time() value)."""
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {"id": job_id, "status": QUEUED, "stage": QUEUED, "created": now,
+                                  "updated": now, "result": None, "error": None}
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def prune(self, before: float) -> None:
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items() if job["status"] in FINISHED and job["updated"] < before]:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a SQLite file (WAL mode), shared by every server process on the host."""
+
+    _COLUMNS = ("status", "stage", "result", "error")
+
+    def __init__(self, path: str = DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, stage TEXT, "
+                "created REAL, updated REAL, result TEXT, error TEXT)"
+            )
+
+    def create(self, job_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, NULL, NULL)", (job_id, QUEUED, QUEUED, now, now))
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields = {k: v for k, v in fields.items() if k in self._COLUMNS}
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {sets}, updated = ? WHERE id = ?",
+                             (*fields.values(), time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, stage, created, updated, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "status", "stage", "created", "updated", "result", "error"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def prune(self, before: float) -> None:
+        with self._lock:
+            self._db.execute(f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND updated < ?",
+                             (*FINISHED, before))
+
+
+def make_store(kind: Optional[str] = None) -> JobStore:
+    kind = (kind or os.environ.get(STORE_ENV) or "memory").lower()
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown job store {kind!r}; use memory or sqlite")
+
+
+class JobQueue:
+    """A bounded FIFO of submitted inputs worked off by `workers` runner tasks.
+
+    Each runner passes the input through `stages` in order, awaiting `run` for
+    every stage (the API runs them in its process pool), and records the stage
+    being worked on so clients can follow progress.
+    """
+
+    def __init__(self, store: JobStore, stages: Sequence[Stage],
+                 run: Callable[..., Awaitable[Any]], workers: int, maxsize: int = QUEUE_SIZE):
+        self.store = store
+        self.stages = tuple(stages)
+        self.run = run
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._tasks = [asyncio.create_task(self._runner()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            job_id, _ = self._queue.get_nowait()
+            self.store.update(job_id, status=FAILED, error="Server shut down before the job started")
+        self._tasks, self._queue = [], None
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, payload: Any) -> str:
+        """Queue `payload` and return its job id; raises `QueueFull` instead of waiting."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self._queue.full():
+            raise QueueFull(f"{self.maxsize} jobs already waiting")
+        self.store.prune(time.time() - JOB_TTL)
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id)
+        self._queue.put_nowait((job_id, payload))
+        return job_id
+
+    async def _runner(self) -> None:
+        while True:
+            job_id, value = await self._queue.get()
+            try:
+                for name, fn in self.stages:
+                    self.store.update(job_id, status=RUNNING, stage=name)
+                    value = await self.run(fn, value)
+                self.store.update(job_id, status=DONE, stage=DONE, result=value)
+            except asyncio.CancelledError:
+                self.store.update(job_id, status=FAILED, error="Server shut down before the job finished")
+                raise
+            except Exception as e:
+                self.store.update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            finally:
+                self._queue.task_done()
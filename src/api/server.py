@@ -0,0 +1,261 @@
+"""HTTP analysis service over multipart DOCX uploads.
+
+Exposes process/type detection, bundle validation and the report builders:
+
+    GET  /health
+    POST /classify          multipart "files" -> process and document types
+    POST /analyze           multipart "files" -> process analysis + compliance report
+    POST /reports/{fmt}     report JSON from /analyze -> html | pdf | docx file
+    POST /jobs              multipart "files" -> 202 and a job id (429 when the queue is full)
+    GET  /jobs/{id}         job status, current stage and, once done, the /analyze result
+    GET  /jobs/{id}/events  the same as server-sent events until the job finishes
+    GET  /metrics           per-stage timings and counters, Prometheus text format
+
+The pipeline is CPU-bound, so each request's work is handed to a shared
+process pool (`ADGM_API_WORKERS`, default one per CPU) with `run_in_executor`;
+the event loop only reads uploads and writes responses, and concurrent
+bundles are analysed side by side. Large bundles should go through /jobs,
+which does not hold the connection open while the analysis runs. Run with:
+
+    python -m src.api.server --host 0.0.0.0 --port 8000
+"""
+
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+
+from fastapi import Body, FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from src.api.jobs import FINISHED, JobQueue, QueueFull, make_store
+from src.core import metrics
+from src.core.parallel import POOL_CONTEXT, resolve_workers, warm_up
+
+# Analysis worker processes (0 or less = one per CPU)
+WORKERS_ENV = "ADGM_API_WORKERS"
+# Jobs analysed at once (default: one per analysis process)
+JOB_WORKERS_ENV = "ADGM_JOB_WORKERS"
+# Seconds between job-state checks while streaming /jobs/{id}/events
+EVENT_POLL = 0.25
+MAX_UPLOAD_BYTES = int(os.environ.get("ADGM_API_MAX_UPLOAD_MB", "50")) * 2**20
+REPORT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def detect_job(files: Dict[str, bytes]) -> Dict[str, Any]:
+    """Process analysis without the parsed documents, so it can cross back to the server cheaply."""
+    from src.core.classify import detect_process_and_types
+    proc_info = detect_process_and_types(files)
+    proc_info.pop("parsed", None)
+    return proc_info
+
+
+def classify_job(files: Dict[str, bytes]) -> Dict[str, Any]:
+    from src.core.classify import process_summary
+    return process_summary(detect_job(files))
+
+
+def validate_job(proc_info: Dict[str, Any]) -> Dict[str, Any]:
+    from src.core.classify import process_summary
+    from src.core.validate import analyze_bundle
+    return {"process_analysis": process_summary(proc_info), "report": analyze_bundle(proc_info)}
+
+
+def analyze_job(files: Dict[str, bytes]) -> Dict[str, Any]:
+    # Classification and validation share this worker, so the parsed documents stay
+    from src.core.classify import detect_process_and_types
+    return validate_job(detect_process_and_types(files))
+
+
+def report_job(fmt: str, report: Dict[str, Any]) -> bytes:
+    from src.core.report import render_report
+    return render_report(fmt, report)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def pool_size() -> int:
+    try:
+        workers = int(os.environ.get(WORKERS_ENV, "0"))
+    except ValueError:
+        workers = 0
+    return resolve_workers(workers)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    if _pool is None:
+        _pool_size = pool_size()
+        _pool = ProcessPoolExecutor(max_workers=_pool_size, mp_context=POOL_CONTEXT, initializer=warm_up)
+    return _pool
+
+
+async def run_in_pool(fn, *args):
+    # Workers hand back what they recorded so /metrics covers the whole pool
+    out, recorded = await asyncio.get_running_loop().run_in_executor(get_pool(), metrics.call, fn, *args)
+    metrics.merge(recorded)
+    return out
+
+
+def job_workers() -> int:
+    try:
+        return int(os.environ.get(JOB_WORKERS_ENV, "0")) or pool_size()
+    except ValueError:
+        return pool_size()
+
+
+_jobs: Optional[JobQueue] = None
+
+
+def get_jobs() -> JobQueue:
+    global _jobs
+    if _jobs is None:
+        _jobs = JobQueue(make_store(), [("classify", detect_job), ("validate", validate_job)], run_in_pool,
+                         job_workers())
+    return _jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the reference indexes in step with references/; workers load what it writes
+    from src.rag.ingest import start_background
+    start_background()
+    get_pool()
+    get_jobs().start()
+    yield
+    await get_jobs().stop()
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+app = FastAPI(title="ADGM Corporate Agent API", lifespan=lifespan)
+
+
+async def read_uploads(files: List[UploadFile]) -> Dict[str, bytes]:
+    """Upload name -> bytes; rejects empty, duplicate-named and oversized uploads."""
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    bundle: Dict[str, bytes] = {}
+    for f in files:
+        name = os.path.basename(f.filename or "")
+        if not name:
+            raise HTTPException(status_code=400, detail="Every upload needs a file name")
+        if name in bundle:
+            raise HTTPException(status_code=400, detail=f"Duplicate file name: {name}")
+        data = await f.read()
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"{name} exceeds {MAX_UPLOAD_BYTES >> 20} MB")
+        bundle[name] = data
+    return bundle
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    get_pool()
+    return {"status": "ok", "workers": _pool_size, "jobs_waiting": get_jobs().pending(),
+            "queue_size": get_jobs().maxsize}
+
+
+@app.post("/classify")
+async def classify(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    """Detect the process and each document's type."""
+    return await run_in_pool(classify_job, await read_uploads(files))
+
+
+@app.post("/analyze")
+async def analyze(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    """Classify and validate a bundle; the "report" field feeds /reports/{fmt}."""
+    return await run_in_pool(analyze_job, await read_uploads(files))
+
+
+@app.post("/reports/{fmt}")
+async def render_report(fmt: str, report: Dict[str, Any] = Body(...)) -> Response:
+    """Render an /analyze report as an HTML, PDF or Word file."""
+    if fmt not in REPORT_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown report format {fmt!r}; use {', '.join(REPORT_TYPES)}")
+    content = await run_in_pool(report_job, fmt, report)
+    return Response(content, media_type=REPORT_TYPES[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="adgm_report.{fmt}"'})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Pipeline stage timings and counters of every analysis process, for Prometheus."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+def _job_or_404(job_id: str) -> Dict[str, Any]:
+    job = get_jobs().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(files: List[UploadFile] = File(...)) -> Response:
+    """Queue a bundle for analysis; poll /jobs/{id} or stream /jobs/{id}/events."""
+    bundle = await read_uploads(files)
+    try:
+        job_id = get_jobs().submit(bundle)
+    except QueueFull as e:
+        metrics.count("jobs_rejected")
+        raise HTTPException(status_code=429, detail=f"Job queue is full ({e}); retry later",
+                            headers={"Retry-After": "5"})
+    return Response(json.dumps({"id": job_id, "status": "queued"}), status_code=202,
+                    media_type="application/json", headers={"Location": f"/jobs/{job_id}"})
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str) -> Dict[str, Any]:
+    return _job_or_404(job_id)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """Server-sent events: one per status/stage change, ending when the job finishes."""
+    _job_or_404(job_id)
+
+    async def stream():
+        last = None
+        while True:
+            job = get_jobs().store.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["stage"])
+            if state != last:
+                last = state
+                event = {k: job[k] for k in ("id", "status", "stage", "error")}
+                yield f"event: {job['status']}\ndata: {json.dumps(event)}\n\n"
+            if job["status"] in FINISHED:
+                return
+            await asyncio.sleep(EVENT_POLL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def main():
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Serve the ADGM analysis API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"analysis processes (default ${WORKERS_ENV}, else one per CPU)")
+    args = parser.parse_args()
+    if args.workers is not None:
+        os.environ[WORKERS_ENV] = str(args.workers)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
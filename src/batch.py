@@ -0,0 +1,230 @@
+"""Headless batch analysis of a directory tree of bundles.
+
+Every directory that directly contains .docx files is one bundle (its path
+relative to the root is the bundle id). Bundles are classified and validated
+across worker processes and written as JSON lines:
+
+    {"bundle": "client-a/2024", "rules_version": "...", "seconds": 0.4,
+     "process_analysis": {...}, "report": {...}}
+
+    python -m src.batch archive/ -o results.jsonl --reports html pdf --resume
+
+With --resume, bundles recorded in the checkpoint under the current rules
+version (and unchanged on disk since) are skipped; a rule change therefore
+re-scores everything. A bundle edited after it was scored is appended again,
+and its last line is the current result.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from src.core.cache import rules_version
+from src.core.parallel import POOL_CONTEXT, resolve_workers, warm_up
+
+CHECKPOINT_FORMAT = 1
+# Seconds between checkpoint writes (always written at the end)
+CHECKPOINT_INTERVAL = 5.0
+
+
+def find_bundles(root: str) -> Iterator[Tuple[str, List[str]]]:
+    """(bundle id, sorted .docx paths) for every directory under `root` holding .docx files."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        # Word lock files ("~$name.docx") are not documents
+        docs = sorted(f for f in filenames if f.lower().endswith(".docx") and not f.startswith("~$"))
+        if docs:
+            yield os.path.relpath(dirpath, root).replace(os.sep, "/"), [os.path.join(dirpath, f) for f in docs]
+
+
+def bundle_signature(paths: List[str]) -> str:
+    """Changes when a file in the bundle is added, removed or modified."""
+    h = hashlib.sha256()
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{os.path.basename(p)}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return h.hexdigest()[:16]
+
+
+def analyze_paths(bundle: str, paths: List[str], report_dir: Optional[str], formats: Tuple[str, ...],
+                  use_cache: bool) -> Dict[str, Any]:
+    """Classify and validate one bundle (runs in a worker process)."""
+    from src.core.classify import detect_process_and_types, process_summary
+    from src.core.report import render_report
+    from src.core.validate import analyze_bundle
+
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"bundle": bundle, "rules_version": rules_version()}
+    try:
+        files = {}
+        for p in paths:
+            with open(p, "rb") as f:
+                files[os.path.basename(p)] = f.read()
+        proc_info = detect_process_and_types(files, use_cache=use_cache, workers=1)
+        report = analyze_bundle(proc_info, use_cache=use_cache, workers=1)
+        record.update(process_analysis=process_summary(proc_info), report=report)
+        if report_dir and formats:
+            out = os.path.join(report_dir, bundle)
+            os.makedirs(out, exist_ok=True)
+            for fmt in formats:
+                with open(os.path.join(out, f"report.{fmt}"), "wb") as f:
+                    f.write(render_report(fmt, report))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+class Checkpoint:
+    """Bundles already written to the output, and the output size that covers them.
+
+    On resume the output is truncated back to `offset`, so lines written after
+    the last checkpoint are not duplicated when their bundles run again.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        self.done: Dict[str, str] = {}
+        self.offset = 0
+        self._saved = 0.0
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("format") != CHECKPOINT_FORMAT or data.get("rules_version") != self.version:
+            return False
+        self.done, self.offset = data["done"], data["offset"]
+        return True
+
+    def save(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._saved < CHECKPOINT_INTERVAL:
+            return
+        self._saved = now
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": CHECKPOINT_FORMAT, "rules_version": self.version,
+                       "offset": self.offset, "done": self.done}, f)
+        os.replace(tmp, self.path)
+
+
+def run(root: str, output: str, checkpoint_path: str, resume: bool = False, workers: Optional[int] = None,
+        report_dir: Optional[str] = None, formats: Tuple[str, ...] = (), use_cache: bool = False) -> Dict[str, Any]:
+    """Analyze every bundle under `root` into `output`; returns throughput statistics."""
+    started = time.perf_counter()
+    checkpoint = Checkpoint(checkpoint_path, rules_version())
+    resumed = resume and checkpoint.load() and os.path.exists(output) and os.path.getsize(output) >= checkpoint.offset
+    if not resumed:
+        checkpoint.done, checkpoint.offset = {}, 0
+
+    bundles = []
+    skipped = 0
+    for bundle, paths in find_bundles(root):
+        signature = bundle_signature(paths)
+        if checkpoint.done.get(bundle) == signature:
+            skipped += 1
+        else:
+            bundles.append((bundle, paths, signature))
+
+    stats = {"bundles": 0, "documents": 0, "failed": 0, "skipped": skipped, "score_total": 0}
+    workers = resolve_workers(workers)
+    if bundles:
+        # Bring the reference indexes up to date once, before any citation is grounded;
+        # workers load them from disk
+        from src.rag import ingest
+        ingest.run_once()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "r+b" if resumed else "wb") as out:
+        out.truncate(checkpoint.offset)
+        out.seek(checkpoint.offset)
+
+        def record(result: Dict[str, Any], bundle: str, paths: List[str], signature: str) -> None:
+            out.write(json.dumps(result).encode("utf-8") + b"\n")
+            out.flush()
+            checkpoint.offset = out.tell()
+            checkpoint.done[bundle] = signature
+            checkpoint.save()
+            stats["bundles"] += 1
+            stats["documents"] += len(paths)
+            if "error" in result:
+                stats["failed"] += 1
+            else:
+                stats["score_total"] += result["report"]["compliance_score"]
+            if stats["bundles"] % 100 == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{stats['bundles']}/{len(bundles)} bundles, {stats['bundles'] / elapsed:.1f}/s", file=sys.stderr)
+
+        if workers <= 1 or len(bundles) <= 1:
+            for bundle, paths, signature in bundles:
+                record(analyze_paths(bundle, paths, report_dir, formats, use_cache), bundle, paths, signature)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT, initializer=warm_up) as pool:
+                # A couple of bundles per worker in flight keeps cores busy without reading the whole archive
+                todo = iter(bundles)
+                running = {}
+                while True:
+                    while len(running) < workers * 2:
+                        job = next(todo, None)
+                        if job is None:
+                            break
+                        running[pool.submit(analyze_paths, job[0], job[1], report_dir, formats, use_cache)] = job
+                    if not running:
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        bundle, paths, signature = running.pop(future)
+                        record(future.result(), bundle, paths, signature)
+        checkpoint.save(force=True)
+
+    elapsed = time.perf_counter() - started
+    scored = stats["bundles"] - stats["failed"]
+    return {
+        "bundles": stats["bundles"],
+        "documents": stats["documents"],
+        "failed": stats["failed"],
+        "skipped": stats["skipped"],
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "bundles_per_second": round(stats["bundles"] / elapsed, 2) if elapsed else 0.0,
+        "documents_per_second": round(stats["documents"] / elapsed, 2) if elapsed else 0.0,
+        "mean_score": round(stats["score_total"] / scored, 1) if scored else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.core.report import REPORT_FORMATS
+    parser = argparse.ArgumentParser(description="Analyze every bundle (directory of .docx files) under a tree.")
+    parser.add_argument("root", help="directory tree to scan")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL results file")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip bundles finished under the current rules according to the checkpoint")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="worker processes (0 = one per CPU)")
+    parser.add_argument("--reports", nargs="+", choices=REPORT_FORMATS, default=[], help="also write these reports")
+    parser.add_argument("--report-dir", default="reports", help="where --reports go, one folder per bundle")
+    parser.add_argument("--cache", action="store_true",
+                        help="use the analysis cache (only pays off when re-running unchanged rules)")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    summary = run(args.root, args.output, args.checkpoint or f"{args.output}.checkpoint", resume=args.resume,
+                  workers=args.workers, report_dir=args.report_dir, formats=tuple(args.reports),
+                  use_cache=args.cache)
+    print(f"{summary['bundles']} bundles ({summary['documents']} documents) in {summary['seconds']}s "
+          f"with {summary['workers']} workers: {summary['bundles_per_second']} bundles/s, "
+          f"{summary['documents_per_second']} documents/s; {summary['skipped']} skipped, "
+          f"{summary['failed']} failed, mean score {summary['mean_score']}")
+
+
+if __name__ == "__main__":
+    main()
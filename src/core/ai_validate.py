@@ -11,7 +11,13 @@ import sys
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 sys.path.insert(0, project_root)
 
-from src.ai.orchestrator import CustomAIOrchestrator, AIConfig
+from src.rag import semantic
+
+try:
+    from src.ai.orchestrator import CustomAIOrchestrator, AIConfig
+except ImportError:
+    # The custom AI package is optional; retrieval features work without it
+    CustomAIOrchestrator = AIConfig = None
 
 # Initialize the custom AI system
 AI_CONFIG = AIConfig(
@@ -23,14 +29,16 @@ AI_CONFIG = AIConfig(
     enable_compliance_ml=True,
     enable_document_generation=True,
     enable_advanced_rag=True
-)
+) if AIConfig is not None else None
 
 # Global AI orchestrator instance
 _ai_orchestrator = None
 
-def get_ai_orchestrator() -> CustomAIOrchestrator:
+def get_ai_orchestrator() -> "CustomAIOrchestrator":
     """Get or create the AI orchestrator instance"""
     global _ai_orchestrator
+    if CustomAIOrchestrator is None:
+        raise RuntimeError("Custom AI orchestrator (src.ai.orchestrator) is not installed")
     if _ai_orchestrator is None:
         _ai_orchestrator = CustomAIOrchestrator(AI_CONFIG)
         # Train models if needed
@@ -42,6 +50,8 @@ def analyze_bundle_advanced(proc_info: Dict[str, Any]) -> Dict[str, Any]:
     Advanced document bundle analysis using custom AI models
     This replaces the basic analyze_bundle function with AI-powered analysis
     """
+    if CustomAIOrchestrator is None:
+        return fallback_basic_analysis(proc_info)
     orchestrator = get_ai_orchestrator()
     
     # Convert proc_info to file_bytes format for AI analysis
@@ -205,20 +215,15 @@ def generate_missing_document(doc_type: str, company_details: Dict[str, Any]) ->
 def get_compliance_insights(query: str, document_text: str) -> List[Dict[str, Any]]:
     """Get RAG-based compliance insights for a specific query"""
     try:
-        orchestrator = get_ai_orchestrator()
-        if orchestrator.rag_retriever:
-            results = orchestrator.rag_retriever.retrieve(query, k=5)
-            return [
-                {
-                    'source': result['metadata'].get('source', 'Unknown'),
-                    'text': result['text'][:300] + '...' if len(result['text']) > 300 else result['text'],
-                    'similarity_score': result['similarity_score'],
-                    'relevance_score': result.get('relevance_score', result['similarity_score'])
-                }
-                for result in results
-            ]
-        else:
-            return []
+        return [
+            {
+                'source': passage.source,
+                'text': passage.text[:300] + '...' if len(passage.text) > 300 else passage.text,
+                'similarity_score': passage.score,
+                'relevance_score': passage.score
+            }
+            for passage in semantic.search(query, k=5)
+        ]
     except Exception as e:
         return [{'error': str(e)}]
 
@@ -0,0 +1,196 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_DIR = os.environ.get("ADGM_CACHE_DIR") or os.path.join(PROJECT_ROOT, "cache")
+
+# Files whose content defines the cached results (blocks, types, fired rules and
+# spans); editing any of them invalidates cached analyses. Citations are not
+# cached (they are grounded at run time), so the retrieval code and the derived
+# reference indexes are deliberately not listed.
+_RULE_SOURCES = [
+    os.environ.get("ADGM_RULEPACK") or os.path.join(PROJECT_ROOT, "src", "rulepacks.yaml"),
+    os.path.join(PROJECT_ROOT, "src", "core", "classify.py"),
+    os.path.join(PROJECT_ROOT, "src", "core", "validate.py"),
+    os.path.join(PROJECT_ROOT, "src", "core", "rules.py"),
+]
+# The disk tier is pruned back under this size (least recently used entries go first)
+CACHE_MAX_BYTES = int(float(os.environ.get("ADGM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# Seconds between prunes of the disk tier by one process
+PRUNE_INTERVAL = float(os.environ.get("ADGM_CACHE_PRUNE_INTERVAL", "300"))
+_rules_version = None
+_rules_stamp = None
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def rules_version() -> str:
+    """Short digest of the rule sources, recomputed only when their mtimes change."""
+    global _rules_version, _rules_stamp
+    stamp = tuple(os.path.getmtime(p) if os.path.exists(p) else 0 for p in _RULE_SOURCES)
+    if stamp != _rules_stamp:
+        h = hashlib.sha256()
+        for p in _RULE_SOURCES:
+            if os.path.exists(p):
+                with open(p, "rb") as f:
+                    h.update(f.read())
+        _rules_version, _rules_stamp = h.hexdigest()[:16], stamp
+    return _rules_version
+
+
+class AnalysisCache:
+    """Content-addressed cache of per-document analysis results.
+
+    Entries are keyed on the SHA-256 of the uploaded bytes plus the rule-pack
+    version and hold the extracted blocks, the classified type per file name
+    and the `DOC_CHECKS` output per document type. Recent entries live in an
+    in-memory LRU; every entry is also persisted as JSON under `directory`.
+    The disk tier drops entries of other rule versions and is kept under
+    `max_bytes` by evicting the files least recently read or written.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory or os.path.join(CACHE_DIR, "analysis")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def key(self, digest: str) -> str:
+        return f"{digest}-{rules_version()}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        key = self.key(digest)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # The mtime is the disk tier's recency
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, entry)
+        return entry
+
+    def update(self, digest: str, **fields: Any) -> None:
+        """Merge `fields` into the entry for `digest` (dict values are merged one level deep)."""
+        key = self.key(digest)
+        entry = dict(self.get(digest) or {})
+        for name, value in fields.items():
+            if isinstance(value, dict) and isinstance(entry.get(name), dict):
+                entry[name] = {**entry[name], **value}
+            else:
+                entry[name] = value
+        self._remember(key, entry)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best-effort; the memory tier still serves this process
+            pass
+        if time.monotonic() - self._last_prune >= PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> Dict[str, int]:
+        """Delete disk entries of other rule versions, then the least recently used ones over `max_bytes`.
+
+        Only one thread per process prunes at a time; others return at once.
+        Returns the number of files removed and the bytes kept.
+        """
+        stats = {"removed": 0, "kept_bytes": 0}
+        if not self._prune_lock.acquire(blocking=False):
+            return stats
+        try:
+            self._last_prune = time.monotonic()
+            suffix = f"-{rules_version()}.json"
+            stale_tmp = time.time() - 3600
+            with self._lock:
+                # Entries this process serves from memory are recent even if their file was not read lately
+                in_memory = {key + ".json" for key in self._memory}
+            kept = []
+            for shard in _scan(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in _scan(shard.path):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        # Left behind by a writer that died; live ones are renamed within moments
+                        remove = st.st_mtime < stale_tmp
+                    else:
+                        remove = not entry.name.endswith(suffix)
+                    if not remove:
+                        recency = float("inf") if entry.name in in_memory else st.st_mtime
+                        kept.append((recency, st.st_size, entry.path))
+                    elif _remove(entry.path):
+                        stats["removed"] += 1
+            total = sum(size for _, size, _ in kept)
+            kept.sort()
+            for _, size, path in kept:
+                if total <= self.max_bytes:
+                    break
+                if _remove(path):
+                    stats["removed"] += 1
+                total -= size
+            stats["kept_bytes"] = total
+            return stats
+        finally:
+            self._prune_lock.release()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+def _scan(directory: str) -> list:
+    try:
+        with os.scandir(directory) as it:
+            return list(it)
+    except OSError:
+        return []
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        # Another process pruned it first
+        return False
+
+
+analysis_cache = AnalysisCache()
@@ -1,58 +1,102 @@
-from typing import Dict, Any
-import re
-
-from src.core.docx_utils import extract_text
-
-# Simple keyword maps for doc types
-DOC_PATTERNS = {
-    "Articles of Association": [r"articles of association", r"aoa"],
-    "Memorandum of Association": [r"memorandum of association", r"moa"],
-    "Shareholder Resolution": [r"shareholder resolution", r"written resolution"],
-    "Board Resolution": [r"board resolution"],
-    "Incorporation Application": [r"incorporation application", r"application to incorporate"],
-    "UBO Declaration": [r"beneficial owner", r"ubo"],
-    "Register of Members and Directors": [r"register of members", r"register of directors"],
-    "Change of Registered Address": [r"change of registered address", r"registered office address"],
-    "Employment Contract": [r"employment contract", r"employee", r"employer"],
-}
+from typing import Dict, Any, Optional, Union
+
+from src.core import metrics
+from src.core.cache import analysis_cache, content_hash
+from src.core.docx_utils import ParsedDocument, parse_docx
+from src.core.parallel import pmap
+from src.core.rules import get_engine
 
-PROCESS_RULES = {
-    "Company Incorporation": [
-        "Articles of Association",
-        "Shareholder Resolution",
-        "Register of Members and Directors",
-    ],
-    "Employment & HR": ["Employment Contract"],
+# Document-type patterns and process rules live in src/rulepacks.yaml
+_ENGINE_VIEWS = {
+    "DOC_PATTERNS": "doc_patterns",
+    "PROCESS_RULES": "process_rules",
 }
 
 
+def __getattr__(name: str):
+    # DOC_PATTERNS / PROCESS_RULES stay importable as snapshots of the current rule pack
+    if name in _ENGINE_VIEWS:
+        return getattr(get_engine(), _ENGINE_VIEWS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@metrics.timed()
 def identify_doc_type(name: str, content: str) -> str:
-    n = name.lower()
-    c = content.lower()
-    for dtype, pats in DOC_PATTERNS.items():
-        for p in pats:
-            if re.search(p, n) or re.search(p, c):
-                return dtype
-    return "Unknown"
+    return get_engine().identify(name, content)
+
+
+def _parse_and_classify(fname: str, data: bytes):
+    """Parse and classify one upload; runs in a pool worker when parallelism is enabled."""
+    try:
+        doc = parse_docx(data)
+    except Exception as e:
+        return None, f"Failed to read DOCX: {e}"
+    return (doc.paragraphs, doc.cells, identify_doc_type(fname, doc.text)), None
+
 
+@metrics.timed("classify")
+def detect_process_and_types(file_bytes: Dict[str, Union[bytes, ParsedDocument]], use_cache: bool = True,
+                             workers: Optional[int] = None) -> Dict[str, Any]:
+    """Classify every upload and detect the process.
+
+    Each DOCX is parsed exactly once; the `ParsedDocument` objects are returned
+    under "parsed" so validation and commenting can reuse them. Uploads whose
+    bytes were seen before are served from the analysis cache, and the rest are
+    parsed/classified across `workers` processes (see `src.core.parallel`).
+    """
+    results = {}
+    jobs = []
+    for fname, raw in file_bytes.items():
+        data = raw.raw if isinstance(raw, ParsedDocument) else raw
+        digest = content_hash(data)
+        entry = (analysis_cache.get(digest) if use_cache else None) or {}
+        dtype = entry.get("types", {}).get(fname)
+        if isinstance(raw, ParsedDocument):
+            doc = raw
+        elif "paragraphs" in entry:
+            doc = ParsedDocument(data, entry["paragraphs"], entry["cells"])
+        else:
+            jobs.append((fname, data))
+            results[fname] = (None, None, digest, None)
+            continue
+        if dtype is None:
+            dtype = identify_doc_type(fname, doc.text)
+            if use_cache:
+                analysis_cache.update(digest, paragraphs=doc.paragraphs, cells=doc.cells, types={fname: dtype})
+        results[fname] = (doc, dtype, digest, None)
+
+    for (fname, data), (out, error) in zip(jobs, pmap(_parse_and_classify, jobs, workers)):
+        digest = results[fname][2]
+        if error:
+            results[fname] = (None, None, digest, error)
+            continue
+        paragraphs, cells, dtype = out
+        if use_cache:
+            analysis_cache.update(digest, paragraphs=paragraphs, cells=cells, types={fname: dtype})
+        results[fname] = (ParsedDocument(data, paragraphs, cells), dtype, digest, None)
 
-def detect_process_and_types(file_bytes: Dict[str, bytes]) -> Dict[str, Any]:
     documents = {}
+    parsed = {}
     types_present = set()
-    for fname, raw in file_bytes.items():
-        try:
-            text, _ = extract_text(raw)
-            dtype = identify_doc_type(fname, text)
-            types_present.add(dtype)
-            documents[fname] = {"type": dtype, "text": text}
-        except Exception as e:
+    for fname in file_bytes:
+        doc, dtype, digest, error = results[fname]
+        if error:
             # Record a safe placeholder and move on; UI can surface this to the user.
-            documents[fname] = {"type": "Unknown", "text": "", "error": f"Failed to read DOCX: {e}"}
+            documents[fname] = {"type": "Unknown", "text": "", "error": error}
+            continue
+        types_present.add(dtype)
+        # Block lengths (and how many of the blocks are paragraphs rather than cells) let
+        # validation report locations in this document's numbering even where the parsed
+        # document itself is not passed along (API jobs)
+        documents[fname] = {"type": dtype, "text": doc.text, "sha256": digest,
+                            "blocks": doc.block_lengths, "paragraphs": len(doc.paragraphs)}
+        parsed[fname] = doc
 
     # Process detection
     process = "Unknown"
-    score = {k: 0 for k in PROCESS_RULES}
-    for proc, must in PROCESS_RULES.items():
+    process_rules = get_engine().process_rules
+    score = {k: 0 for k in process_rules}
+    for proc, must in process_rules.items():
         for m in must:
             if m in types_present:
                 score[proc] += 1
@@ -61,4 +105,15 @@ def detect_process_and_types(file_bytes: Dict[str, bytes]) -> Dict[str, Any]:
         if score[process] == 0:
             process = "Unknown"
 
-    return {"process": process, "documents": documents}
+    return {"process": process, "documents": documents, "parsed": parsed}
+
+
+def process_summary(proc_info: Dict[str, Any]) -> Dict[str, Any]:
+    """`detect_process_and_types` output without parsed documents, text and block layout, for JSON results."""
+    return {
+        "process": proc_info.get("process", "Unknown"),
+        "documents": {
+            name: {k: v for k, v in meta.items() if k not in ("text", "blocks", "paragraphs")}
+            for name, meta in proc_info.get("documents", {}).items()
+        },
+    }
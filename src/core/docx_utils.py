@@ -1,63 +1,500 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Union
 from io import BytesIO
+from bisect import bisect_right
+from datetime import datetime, timezone
+import copy
+import posixpath
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
 from docx import Document
-from docx.shared import RGBColor
+from lxml import etree
+
+from src.core import metrics
+
+W_URI = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_NS = "{" + W_URI + "}"
+_PKG_REL_URI = "http://schemas.openxmlformats.org/package/2006/relationships"
+_PKG_REL_NS = "{" + _PKG_REL_URI + "}"
+_CONTENT_TYPES_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+_OFFICE_DOCUMENT_REL = "/officeDocument"
+_COMMENTS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+_COMMENTS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+COMMENT_AUTHOR = "ADGM Corporate Agent"
+
+# The blocks `iter_docx_blocks` emits, located in a parsed tree
+_W_XPATH_NS = {"w": W_URI}
+_BODY_PARAGRAPHS = etree.XPath("w:body/w:p", namespaces=_W_XPATH_NS)
+_TOP_LEVEL_CELLS = etree.XPath("//w:tc[count(ancestor::w:tbl) = 1]", namespaces=_W_XPATH_NS)
+_CELL_PARAGRAPHS = etree.XPath("w:p", namespaces=_W_XPATH_NS)
+
+_W_BODY = W_NS + "body"
+_W_P = W_NS + "p"
+_W_PPR = W_NS + "pPr"
+_W_R = W_NS + "r"
+_W_RPR = W_NS + "rPr"
+_W_T = W_NS + "t"
+_W_HYPERLINK = W_NS + "hyperlink"
+_W_TBL = W_NS + "tbl"
+_W_TC = W_NS + "tc"
+_W_TCPR = W_NS + "tcPr"
+_W_VMERGE = W_NS + "vMerge"
+_W_VAL = W_NS + "val"
+_W_TYPE = W_NS + "type"
+_W_ID = W_NS + "id"
+_W_COMMENT = W_NS + "comment"
+_W_COMMENT_RANGE_START = W_NS + "commentRangeStart"
+_W_COMMENT_RANGE_END = W_NS + "commentRangeEnd"
+_W_COMMENT_REFERENCE = W_NS + "commentReference"
+# Run children and their text equivalents, mirroring python-docx `Run.text`
+_RUN_TEXT = {
+    W_NS + "tab": "\t",
+    W_NS + "ptab": "\t",
+    W_NS + "cr": "\n",
+    W_NS + "noBreakHyphen": "-",
+}
+
+
+class ParsedDocument:
+    """A DOCX parsed once per upload and shared by classify, validate and commenting.
+
+    `text` is the paragraphs followed by the table cells joined with newlines
+    (the same string `extract_text` has always returned); `offsets[i]` is the
+    character offset of block `i` within it.
+    """
+
+    def __init__(self, raw: bytes, paragraphs: List[str], cells: List[str], document=None):
+        self.raw = raw
+        self.paragraphs = paragraphs
+        self.cells = cells
+        blocks = paragraphs + cells
+        self.text = "\n".join(blocks)
+        self.offsets = block_offsets([len(b) for b in blocks])
+        self._document = document
+
+    @property
+    def document(self):
+        """The python-docx `Document`, loaded on first access."""
+        if self._document is None:
+            self._document = Document(BytesIO(self.raw))
+        return self._document
+
+    def block_at(self, offset: int) -> int:
+        """Index of the paragraph/cell block containing character `offset` of `text`."""
+        return max(bisect_right(self.offsets, offset) - 1, 0)
+
+    @property
+    def block_lengths(self) -> List[int]:
+        """Length of each block, paragraphs then cells; enough to `locate` spans without the text."""
+        return [len(b) for b in self.paragraphs] + [len(b) for b in self.cells]
+
+    def locate(self, start: int, end: int) -> Tuple[int, int, int]:
+        """(block, start, end) for a span of `text`, with offsets local to the block and clipped to it."""
+        block = self.block_at(start)
+        base = self.offsets[block]
+        n_paragraphs = len(self.paragraphs)
+        size = len(self.paragraphs[block] if block < n_paragraphs else self.cells[block - n_paragraphs])
+        return block, start - base, min(end - base, size)
+
+    def __getstate__(self):
+        # The python-docx tree is not picklable; it is rebuilt from `raw` on demand.
+        state = self.__dict__.copy()
+        state["_document"] = None
+        return state
+
+
+def block_offsets(lengths: List[int]) -> List[int]:
+    """Offset of each block in the newline-joined text, given `ParsedDocument.block_lengths`."""
+    offsets = []
+    pos = 0
+    for n in lengths:
+        offsets.append(pos)
+        pos += n + 1
+    return offsets
+
+
+def locate_span(lengths: List[int], offsets: List[int], start: int, end: int) -> Tuple[int, int, int]:
+    """`ParsedDocument.locate` from block lengths and `block_offsets` alone."""
+    block = max(bisect_right(offsets, start) - 1, 0)
+    base = offsets[block]
+    return block, start - base, min(end - base, lengths[block])
+
+
+def _main_part_name(zf: zipfile.ZipFile) -> str:
+    """Resolve the main document part from the package relationships."""
+    try:
+        rels = ET.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(_PKG_REL_NS + "Relationship"):
+        if rel.get("Type", "").endswith(_OFFICE_DOCUMENT_REL):
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return "word/document.xml"
+
+
+def _run_child_text(e) -> str:
+    if e.tag == _W_T:
+        return e.text or ""
+    if e.tag == W_NS + "br":
+        return "\n" if e.get(_W_TYPE, "textWrapping") == "textWrapping" else ""
+    return _RUN_TEXT.get(e.tag, "")
+
+
+def _run_text(r) -> str:
+    return "".join([_run_child_text(e) for e in r])
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for child in p:
+        if child.tag == _W_R:
+            parts.append(_run_text(child))
+        elif child.tag == _W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == _W_R)
+    return "".join(parts)
+
+
+def _is_merge_continuation(tc) -> bool:
+    tc_pr = tc.find(_W_TCPR)
+    if tc_pr is None:
+        return False
+    v_merge = tc_pr.find(_W_VMERGE)
+    return v_merge is not None and v_merge.get(_W_VAL, "continue") == "continue"
+
+
+def iter_docx_blocks(doc_bytes: bytes) -> Iterator[Tuple[str, str]]:
+    """Stream ("paragraph" | "cell", text) blocks out of a DOCX in document order.
+
+    Reads the main document part incrementally with `iterparse` instead of
+    building a python-docx tree. Body paragraphs and top-level table cells are
+    emitted with the same text python-docx gives for them, except that a merged
+    cell is emitted once rather than once per grid column/row it spans.
+    """
+    with zipfile.ZipFile(BytesIO(doc_bytes)) as zf:
+        with zf.open(_main_part_name(zf)) as xml:
+            stack = []
+            tbl_depth = 0
+            cell_paras: List[str] = []
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    if elem.tag == _W_TBL:
+                        tbl_depth += 1
+                    continue
+                stack.pop()
+                parent = stack[-1] if stack else None
+                tag = elem.tag
+                if tag == _W_P:
+                    if parent is not None and parent.tag == _W_BODY:
+                        yield "paragraph", _paragraph_text(elem)
+                    elif tbl_depth == 1 and parent is not None and parent.tag == _W_TC:
+                        cell_paras.append(_paragraph_text(elem))
+                elif tag == _W_TC and tbl_depth == 1:
+                    if not _is_merge_continuation(elem):
+                        yield "cell", "\n".join(cell_paras)
+                    cell_paras = []
+                elif tag == _W_TBL:
+                    tbl_depth -= 1
+                if parent is not None and parent.tag == _W_BODY:
+                    # Body children are fully consumed; drop them to keep memory flat
+                    parent.remove(elem)
+
+
+@metrics.timed("extract")
+def parse_docx(doc_bytes: bytes) -> ParsedDocument:
+    """Parse DOCX bytes once into a `ParsedDocument` using the streaming extractor.
+
+    The python-docx `Document` is only built if a caller (commenting) asks for it.
+    """
+    metrics.count("docx_bytes_parsed", len(doc_bytes))
+    paragraphs: List[str] = []
+    cells: List[str] = []
+    for kind, text in iter_docx_blocks(doc_bytes):
+        (paragraphs if kind == "paragraph" else cells).append(text)
+    return ParsedDocument(doc_bytes, paragraphs, cells)
 
 
 def extract_text(doc_bytes: bytes) -> Tuple[str, Document]:
     """Return full text and the loaded Document object."""
-    doc = Document(BytesIO(doc_bytes))
-    texts = []
-    for p in doc.paragraphs:
-        texts.append(p.text)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                texts.append(cell.text)
-    return "\n".join(texts), doc
-
-
-def insert_comments_and_return_bytes(doc_bytes: bytes, comments: List[Dict[str, Any]]) -> bytes:
-    """
-    Pseudo-inline comments: we append short red inline notes next to the first matching text per issue.
-    Fallback-friendly approach using python-docx (true Word comments require low-level XML).
-    Expected comment dict keys: { 'issue', 'location', 'suggestion', 'citations' }
+    parsed = parse_docx(doc_bytes)
+    return parsed.text, parsed.document
+
+
+def lowered_text(text: str) -> str:
+    """`text.lower()`, keeping every offset valid for `text`."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters lowercase to two; leave those as they are
+    return "".join([c if len(c.lower()) != 1 else c.lower() for c in text])
+
+
+def find_anchors(text: str, anchors: List[str]) -> Dict[str, int]:
+    """Offset in `text` of each anchor, matched case-insensitively, in a single scan.
+
+    All anchors are folded into one alternation searched left to right; an
+    anchor that only occurs inside the match of a longer one is looked up on
+    its own afterwards. Anchors that do not occur are left out.
     """
-    text, doc = extract_text(doc_bytes)
+    pending = {a.lower() for a in anchors if a}
+    found: Dict[str, int] = {}
+    if not pending:
+        return found
+    lowered = lowered_text(text)
+    pattern = re.compile("|".join(re.escape(a) for a in sorted(pending, key=len, reverse=True)))
+    for m in pattern.finditer(lowered):
+        anchor = m.group()
+        if anchor in pending:
+            found[anchor] = m.start()
+            pending.discard(anchor)
+            if not pending:
+                break
+    for anchor in pending:
+        pos = lowered.find(anchor)
+        if pos != -1:
+            found[anchor] = pos
+    return found
+
+
+def _text_runs(p) -> list:
+    """The runs making up `_paragraph_text(p)`, in order."""
+    runs = []
+    for child in p:
+        if child.tag == _W_R:
+            runs.append(child)
+        elif child.tag == _W_HYPERLINK:
+            runs.extend(r for r in child if r.tag == _W_R)
+    return runs
+
+
+def _split_run(r, k: int):
+    """Split run `r` before its `k`-th character; returns the new right-hand run."""
+    right = r.makeelement(r.tag, r.attrib)
+    rpr = r.find(_W_RPR)
+    if rpr is not None:
+        right.append(copy.deepcopy(rpr))
+    pos = 0
+    for child in list(r):
+        if child is rpr:
+            continue
+        if pos >= k:
+            right.append(child)
+            continue
+        piece = _run_child_text(child)
+        if pos + len(piece) > k and child.tag == _W_T:
+            tail = child.makeelement(_W_T, {_XML_SPACE: "preserve"})
+            tail.text = piece[k - pos:]
+            child.text = piece[:k - pos]
+            child.set(_XML_SPACE, "preserve")
+            right.append(tail)
+        pos += len(piece)
+    r.addnext(right)
+    return right
+
+
+def _runs_between(p, start: int, end: int) -> list:
+    """The runs of `p` covering characters [start, end) of its text, split at both ends."""
+    covered = []
+    pos = 0
+    for r in _text_runs(p):
+        n = len(_run_text(r))
+        if pos + n <= start:
+            pos += n
+            continue
+        if pos >= end:
+            break
+        if pos < start:
+            r = _split_run(r, start - pos)
+            n -= start - pos
+            pos = start
+        if pos + n > end:
+            _split_run(r, end - pos)
+            n = end - pos
+        covered.append(r)
+        pos += n
+    return covered
+
+
+def _mark_comment(p, start: int, end: int, comment_id: str) -> None:
+    """Anchor comment `comment_id` on characters [start, end) of paragraph `p`, or all of it."""
+    range_start = p.makeelement(_W_COMMENT_RANGE_START, {_W_ID: comment_id})
+    range_end = p.makeelement(_W_COMMENT_RANGE_END, {_W_ID: comment_id})
+    reference = p.makeelement(_W_R, {})
+    reference.append(p.makeelement(_W_COMMENT_REFERENCE, {_W_ID: comment_id}))
+    covered = _runs_between(p, start, end) if end > start else []
+    if covered:
+        covered[0].addprevious(range_start)
+        covered[-1].addnext(range_end)
+    else:
+        p.insert(1 if len(p) and p[0].tag == _W_PPR else 0, range_start)
+        p.append(range_end)
+    range_end.addnext(reference)
+
+
+def _comment_element(parent, comment_id: str, comment: Dict[str, Any], author: str, date: str):
+    lines = [f"[{comment.get('severity') or 'Medium'}] {comment.get('issue', 'Issue')}"]
+    if comment.get("suggestion"):
+        lines.append(f"Suggestion: {comment['suggestion']}")
+    cite = ", ".join(comment.get("citations", []) or [])
+    if cite:
+        lines.append(f"Sources: {cite}")
+    initials = "".join(word[0] for word in author.split())[:9]
+    el = parent.makeelement(_W_COMMENT, {_W_ID: comment_id, W_NS + "author": author,
+                                         W_NS + "date": date, W_NS + "initials": initials})
+    for i, line in enumerate(lines):
+        p = etree.SubElement(el, _W_P)
+        if i == 0:
+            etree.SubElement(etree.SubElement(p, _W_R), W_NS + "annotationRef")
+        t = etree.SubElement(etree.SubElement(p, _W_R), _W_T, {_XML_SPACE: "preserve"})
+        t.text = line
+    return el
+
 
-    # Build a quick paragraph index
-    para_texts = [p.text for p in doc.paragraphs]
+def _part_path(base_part: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_part), target))
 
+
+def _xml_bytes(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _block_elements(root) -> List[list]:
+    """The `w:p` elements behind each `ParsedDocument` block: a body paragraph, or a cell's paragraphs."""
+    paragraphs = [[p] for p in _BODY_PARAGRAPHS(root)]
+    cells = [_CELL_PARAGRAPHS(tc) for tc in _TOP_LEVEL_CELLS(root) if not _is_merge_continuation(tc)]
+    return paragraphs + cells
+
+
+def _comment_targets(parsed: ParsedDocument, comments: List[Dict[str, Any]]) -> List[Tuple[int, int, int]]:
+    """(block, start, end) per comment, offsets within the block's text.
+
+    A (block, start, end) `location` recorded by the validators is used as is;
+    text anchors are searched for.
+    """
+    texts = parsed.paragraphs + parsed.cells
+    # Unanchored comments go on the first paragraph with text
+    default = next((i for i, t in enumerate(texts) if t.strip()), 0)
+    anchors = [c["location"] for c in comments if isinstance(c.get("location"), str)]
+    found = find_anchors(parsed.text, anchors)
+    targets = []
     for c in comments:
-        note = c.get("issue", "Issue")
-        suggestion = c.get("suggestion")
-        cite = ", ".join(c.get("citations", []) or [])
-        anchor = c.get("location") or ""
-
-        # Find first paragraph containing the anchor; else use first paragraph
-        idx = 0
-        if anchor:
-            for i, t in enumerate(para_texts):
-                if anchor.lower() in (t or "").lower():
-                    idx = i
-                    break
-        if idx >= len(doc.paragraphs):
-            idx = len(doc.paragraphs) - 1 if doc.paragraphs else 0
-
-        if not doc.paragraphs:
-            # Create at least one paragraph
-            doc.add_paragraph("")
-
-        p = doc.paragraphs[idx]
-        run = p.add_run(f"  [Comment: {note}]")
-        run.font.color.rgb = RGBColor(200, 0, 0)
-        if suggestion:
-            run2 = p.add_run(f" Suggestion: {suggestion}")
-            run2.font.color.rgb = RGBColor(120, 0, 0)
-        if cite:
-            run3 = p.add_run(f" Sources: {cite}")
-            run3.font.color.rgb = RGBColor(90, 90, 90)
-
-    out = BytesIO()
-    doc.save(out)
+        anchor = c.get("location")
+        if isinstance(anchor, (tuple, list)) and len(anchor) == 3:
+            targets.append(tuple(anchor))
+            continue
+        pos = found.get(anchor.lower()) if isinstance(anchor, str) and anchor else None
+        if pos is None:
+            targets.append((default, 0, 0))
+            continue
+        block = parsed.block_at(pos)
+        start = pos - parsed.offsets[block]
+        targets.append((block, start, min(start + len(anchor), len(texts[block]))))
+    return targets
+
+
+def _target_paragraph(paras: list, start: int, end: int) -> Tuple[Any, int, int]:
+    """The paragraph of a (cell) block holding offset `start`, with offsets made local to it."""
+    for p in paras[:-1]:
+        n = len(_paragraph_text(p))
+        if start <= n:
+            return p, start, min(end, n)
+        start -= n + 1
+        end -= n + 1
+    return paras[-1], max(start, 0), max(end, 0)
+
+
+@metrics.timed("comment")
+def insert_comments_and_return_bytes(doc_bytes: Union[bytes, ParsedDocument], comments: List[Dict[str, Any]],
+                                     author: str = COMMENT_AUTHOR) -> bytes:
+    """
+    Add a Word comment per entry and return the new DOCX bytes.
+    Expected comment dict keys: { 'issue', 'location', 'suggestion', 'citations' }, optionally 'severity'.
+    `location` is either the (block, start, end) span the validators recorded (see
+    `ParsedDocument.locate`), which is highlighted exactly, or a text anchor, which is placed on
+    its first case-insensitive occurrence; comments without one (or whose text is not found) go on
+    the first paragraph with text.
+    Text anchors are resolved in one scan of the extracted text, and the package is rewritten
+    part by part without python-docx: only the main document, its relationships, the content
+    types and the comments part change.
+    Accepts raw bytes or a `ParsedDocument` already built during classification.
+    """
+    parsed = doc_bytes if isinstance(doc_bytes, ParsedDocument) else parse_docx(doc_bytes)
+    if not comments:
+        return parsed.raw
+    targets = _comment_targets(parsed, comments)
+    xml_parser = etree.XMLParser(huge_tree=True, resolve_entities=False)
+
+    with zipfile.ZipFile(BytesIO(parsed.raw)) as zin:
+        names = set(zin.namelist())
+        main = _main_part_name(zin)
+        root = etree.fromstring(zin.read(main), xml_parser)
+        blocks = _block_elements(root)
+
+        rels_name = posixpath.join(posixpath.dirname(main), "_rels", posixpath.basename(main) + ".rels")
+        if rels_name in names:
+            rels = etree.fromstring(zin.read(rels_name), xml_parser)
+        else:
+            rels = etree.Element(_PKG_REL_NS + "Relationships", nsmap={None: _PKG_REL_URI})
+        comments_name = None
+        for rel in rels.iter(_PKG_REL_NS + "Relationship"):
+            if rel.get("Type") == _COMMENTS_REL and rel.get("TargetMode") != "External":
+                comments_name = _part_path(main, rel.get("Target", ""))
+        content_types = None
+        if comments_name is None:
+            n = 0
+            comments_name = _part_path(main, "comments.xml")
+            while comments_name in names:
+                n += 1
+                comments_name = _part_path(main, f"comments{n}.xml")
+            rel_ids = {rel.get("Id") for rel in rels}
+            n = len(rel_ids) + 1
+            while f"rId{n}" in rel_ids:
+                n += 1
+            etree.SubElement(rels, _PKG_REL_NS + "Relationship", Id=f"rId{n}", Type=_COMMENTS_REL,
+                             Target=posixpath.relpath(comments_name, posixpath.dirname(main)))
+            content_types = etree.fromstring(zin.read("[Content_Types].xml"), xml_parser)
+            etree.SubElement(content_types, _CONTENT_TYPES_NS + "Override",
+                             PartName="/" + comments_name, ContentType=_COMMENTS_CONTENT_TYPE)
+        if comments_name in names:
+            comments_root = etree.fromstring(zin.read(comments_name), xml_parser)
+        else:
+            comments_root = etree.Element(W_NS + "comments", nsmap={"w": W_URI})
+
+        # Comment ids must not collide with ones the document already has
+        used = [int(e.get(_W_ID)) for e in comments_root.iter(_W_COMMENT) if (e.get(_W_ID) or "").isdigit()]
+        next_id = max(used, default=-1) + 1
+        if not any(blocks):
+            body = root.find(_W_BODY)
+            p = body.makeelement(_W_P, {})
+            body.insert(0, p)
+            blocks = [[p]]
+        fallback = next(paras for paras in blocks if paras)
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for comment, (block, start, end) in zip(comments, targets):
+            comment_id = str(next_id)
+            next_id += 1
+            paras = blocks[block] if block < len(blocks) and blocks[block] else fallback
+            p, start, end = _target_paragraph(paras, start, end)
+            _mark_comment(p, start, end, comment_id)
+            comments_root.append(_comment_element(comments_root, comment_id, comment, author, date))
+
+        parts = {main: root, rels_name: rels, comments_name: comments_root}
+        if content_types is not None:
+            parts["[Content_Types].xml"] = content_types
+        out = BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                info = copy.copy(info)
+                if info.filename in parts:
+                    zout.writestr(info, _xml_bytes(parts.pop(info.filename)))
+                else:
+                    with zin.open(info) as src, zout.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+            for name, part in parts.items():
+                zout.writestr(name, _xml_bytes(part))
     return out.getvalue()
@@ -0,0 +1,92 @@
+"""Per-session temp files for UI downloads.
+
+Artifacts (reports, commented documents, exports) are produced on first
+request and written under `<root>/<session>/<bundle>/<name>`; later reruns
+read the file instead of rebuilding or re-encoding it. Session folders not
+used for `ttl` seconds are deleted by `cleanup`, which `get` runs at most
+once per `CLEANUP_INTERVAL`.
+"""
+
+from typing import Callable, Union
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from src.core import metrics
+
+DOWNLOAD_DIR = os.environ.get("ADGM_DOWNLOAD_DIR") or os.path.join(tempfile.gettempdir(), "adgm-downloads")
+DOWNLOAD_TTL = float(os.environ.get("ADGM_DOWNLOAD_TTL", "3600"))
+# Seconds between sweeps for expired sessions
+CLEANUP_INTERVAL = 60.0
+
+
+def _safe(part: str) -> str:
+    """A path component for `part`: readable when it is plain, hashed when it is not."""
+    if part and all(c.isalnum() or c in "-_." for c in part) and not part.startswith("."):
+        return part
+    return hashlib.sha256(part.encode("utf-8")).hexdigest()[:32]
+
+
+class DownloadStore:
+    """Artifacts on disk, one folder per UI session, expired after `ttl` seconds idle."""
+
+    def __init__(self, root: str = DOWNLOAD_DIR, ttl: float = DOWNLOAD_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._swept = 0.0
+
+    def path(self, session: str, bundle: str, name: str) -> str:
+        return os.path.join(self.root, _safe(session), _safe(bundle), _safe(name))
+
+    def has(self, session: str, bundle: str, name: str) -> bool:
+        return os.path.exists(self.path(session, bundle, name))
+
+    def get(self, session: str, bundle: str, name: str, produce: Callable[[], Union[bytes, str]]) -> str:
+        """Path of the artifact, calling `produce` only if it is not on disk yet."""
+        self.cleanup()
+        path = self.path(session, bundle, name)
+        if not os.path.exists(path):
+            with metrics.timer("download_write"):
+                data = produce()
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        # The session folder's mtime marks its last use
+        os.utime(os.path.join(self.root, _safe(session)))
+        return path
+
+    def read(self, session: str, bundle: str, name: str, produce: Callable[[], Union[bytes, str]]) -> bytes:
+        with open(self.get(session, bundle, name, produce), "rb") as f:
+            return f.read()
+
+    def remove(self, session: str) -> None:
+        shutil.rmtree(os.path.join(self.root, _safe(session)), ignore_errors=True)
+
+    def cleanup(self, force: bool = False) -> int:
+        """Delete session folders idle for longer than `ttl`; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._swept < CLEANUP_INTERVAL:
+                return 0
+            self._swept = now
+        removed = 0
+        try:
+            sessions = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for entry in sessions:
+            try:
+                if entry.is_dir() and now - entry.stat().st_mtime > self.ttl:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
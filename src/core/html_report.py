@@ -1,7 +1,12 @@
 from typing import Dict, Any, List
 
+from src.core import metrics
+
+
+@metrics.timed("report_html")
 def build_html_report(report: Dict[str, Any]) -> str:
     issues: List[Dict[str, Any]] = report.get("issues_found", [])
+    paragraph_counts: Dict[str, int] = report.get("paragraph_counts", {})
     missing = report.get("missing_documents", [])
     css = """
     body{font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin:24px;}
@@ -19,6 +24,19 @@ def build_html_report(report: Dict[str, Any]) -> str:
         cls = (sev or "").lower()
         return f'<span class="badge {cls}">{sev}</span>'
 
+    def location(loc, document: str) -> str:
+        # (block, start, end) recorded by the validators: paragraphs first, then table cells,
+        # each numbered from 1 for readers
+        if not loc:
+            return ""
+        block, start, end = loc
+        paragraphs = paragraph_counts.get(document)
+        if paragraphs is not None and block >= paragraphs:
+            label = f"cell {block - paragraphs + 1}"
+        else:
+            label = f"¶ {block + 1}"
+        return f"<span title='characters {start}-{end}'>{label}</span>"
+
     parts = []
     parts.append(f"<html><head><meta charset='utf-8'><title>Detailed Analysis</title><style>{css}</style></head><body>")
     parts.append("<h1>ADGM Corporate Agent - Detailed Analysis</h1>")
@@ -46,12 +64,14 @@ def build_html_report(report: Dict[str, Any]) -> str:
     if not issues:
         parts.append("<p>No issues detected.</p>")
     else:
-        parts.append("<table><thead><tr><th>Document</th><th>Severity</th><th>Issue</th><th>Suggestion</th><th>Sources</th></tr></thead><tbody>")
+        parts.append("<table><thead><tr><th>Document</th><th>Location</th><th>Severity</th><th>Issue</th><th>Suggestion</th><th>Sources</th></tr></thead><tbody>")
         for it in issues:
             cits = "; ".join(it.get('citations') or [])
+            suggestion = (it.get('suggestion','') or '').replace('\n',' ')
             parts.append(
-                f"<tr><td>{it.get('document','')}</td><td>{badge(it.get('severity',''))}</td>"
-                f"<td>{it.get('issue','')}</td><td>{(it.get('suggestion','') or '').replace('\n',' ')}</td>"
+                f"<tr><td>{it.get('document','')}</td><td>{location(it.get('location'), it.get('document', ''))}</td>"
+                f"<td>{badge(it.get('severity',''))}</td>"
+                f"<td>{it.get('issue','')}</td><td>{suggestion}</td>"
                 f"<td>{cits}</td></tr>"
             )
         parts.append("</tbody></table>")
@@ -0,0 +1,171 @@
+"""In-process timers and counters for the analysis pipeline.
+
+Stages are wrapped with `timed` (or a `timer` block) and extra quantities are
+added with `count`. Figures accumulate per process: pool workers return theirs
+with `call` and the caller folds them back in with `merge` (see
+`src.core.parallel.pmap` and the API pool), so one process can report the
+whole pipeline. `render_prometheus` formats them for scraping.
+
+Recording is on unless ADGM_METRICS=0, in which case `timed` leaves functions
+unwrapped. `set_enabled(False)` pauses recording at run time; wrapped
+functions then cost one flag check.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+import functools
+import os
+import threading
+import time
+
+METRICS_ENV = "ADGM_METRICS"
+PREFIX = "adgm"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = os.environ.get(METRICS_ENV, "1").strip().lower() not in ("0", "false", "no", "off")
+
+# stage -> [calls, total seconds, max seconds]
+_timers: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+_lock = threading.Lock()
+
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+def set_enabled(flag: bool) -> None:
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record one call of `stage` taking `seconds`."""
+    with _lock:
+        t = _timers.get(stage)
+        if t is None:
+            _timers[stage] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+
+def count(name: str, n: float = 1) -> None:
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(stage: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator timing every call of the function as `stage` (default: its name)."""
+    def wrap(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+        name = stage or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started)
+        return inner
+    return wrap
+
+
+@contextmanager
+def timer(stage: str):
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def snapshot() -> Snapshot:
+    """{"timers": {stage: (calls, total, max)}, "counters": {name: value}}; plain data, picklable."""
+    with _lock:
+        return {"timers": {k: tuple(v) for k, v in _timers.items()}, "counters": dict(_counters)}
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def drain() -> Snapshot:
+    """`snapshot` and reset, atomically."""
+    global _timers, _counters
+    with _lock:
+        out = {"timers": {k: tuple(v) for k, v in _timers.items()}, "counters": _counters}
+        _timers, _counters = {}, {}
+    return out
+
+
+def merge(other: Snapshot) -> None:
+    """Add another process's `drain` output to this one's figures."""
+    with _lock:
+        for stage, (calls, total, longest) in other.get("timers", {}).items():
+            t = _timers.get(stage)
+            if t is None:
+                _timers[stage] = [calls, total, longest]
+            else:
+                t[0] += calls
+                t[1] += total
+                t[2] = max(t[2], longest)
+        for name, n in other.get("counters", {}).items():
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def call(fn: Callable, *args: Any) -> Tuple[Any, Snapshot]:
+    """Run `fn` in a pool worker and hand back its result with the metrics it recorded."""
+    return fn(*args), drain()
+
+
+def summary() -> List[Dict[str, Any]]:
+    """One row per stage, slowest total first: stage, calls, total_s, mean_ms, max_ms."""
+    rows = [
+        {"stage": stage, "calls": int(calls), "total_s": round(total, 3),
+         "mean_ms": round(total / calls * 1e3, 2) if calls else 0.0, "max_ms": round(longest * 1e3, 2)}
+        for stage, (calls, total, longest) in snapshot()["timers"].items()
+    ]
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "_:" else "_" for c in name)
+
+
+def render_prometheus() -> str:
+    """All figures in the Prometheus text exposition format."""
+    snap = snapshot()
+    timers = sorted(snap["timers"].items())
+    lines = [
+        f"# HELP {PREFIX}_stage_seconds Time spent in each pipeline stage.",
+        f"# TYPE {PREFIX}_stage_seconds summary",
+    ]
+    for stage, (calls, total, _) in timers:
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{_label(stage)}"}} {total:.6f}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{_label(stage)}"}} {int(calls)}')
+    lines += [
+        f"# HELP {PREFIX}_stage_max_seconds Longest single call of each pipeline stage.",
+        f"# TYPE {PREFIX}_stage_max_seconds gauge",
+    ]
+    for stage, (_, _, longest) in timers:
+        lines.append(f'{PREFIX}_stage_max_seconds{{stage="{_label(stage)}"}} {longest:.6f}')
+    for name, value in sorted(snap["counters"].items()):
+        metric = f"{PREFIX}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    return "\n".join(lines) + "\n"
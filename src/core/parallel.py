@@ -0,0 +1,81 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import multiprocessing
+import os
+import threading
+
+from src.core import metrics
+
+# Number of worker processes used when callers do not pass `workers` (1 = serial)
+WORKERS_ENV = "ADGM_WORKERS"
+
+# Every process pool in the project starts its workers with spawn, never fork: the
+# processes that own pools run other threads (Streamlit script threads, the reference
+# ingest daemon, the hybrid retrieval executor, the API event loop), and a child forked
+# while one of them holds a lock such as the rule engine's or the metrics registry's
+# would deadlock the first time it takes that lock.
+POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Worker count from the argument or ADGM_WORKERS; 0 or less means one per CPU."""
+    if workers is None:
+        try:
+            workers = int(os.environ.get(WORKERS_ENV, "1"))
+        except ValueError:
+            workers = 1
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def warm_up() -> None:
+    """Pool initializer: import the pipeline and compile the rule pack once per worker, not on its first job."""
+    from src.core.rules import get_engine
+    import src.core.classify  # noqa: F401
+    import src.core.validate  # noqa: F401
+    get_engine()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool of the given size, created on first use."""
+    with _lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT, initializer=warm_up)
+            _pools[workers] = pool
+        return pool
+
+
+def pmap(fn: Callable[..., Any], args: Sequence[Tuple], workers: Optional[int] = None) -> List[Any]:
+    """Apply `fn` to each argument tuple, in order, across a process pool.
+
+    Runs inline when only one worker is configured or there is at most one job,
+    so the serial path has no pickling or pool overhead. `fn` must be a
+    module-level function. Timings recorded in the workers are merged into
+    this process's `src.core.metrics`.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(args) <= 1:
+        return [fn(*a) for a in args]
+    pool = get_pool(workers)
+    chunksize = max(1, len(args) // (workers * 4))
+    if not metrics.ENABLED:
+        return list(pool.map(fn, *zip(*args), chunksize=chunksize))
+    results = []
+    for out, recorded in pool.map(metrics.call, [fn] * len(args), *zip(*args), chunksize=chunksize):
+        metrics.merge(recorded)
+        results.append(out)
+    return results
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
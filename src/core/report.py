@@ -4,7 +4,10 @@ from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from textwrap import wrap
 
+from src.core import metrics
 
+
+@metrics.timed("report_pdf")
 def build_summary_pdf(report: Dict) -> bytes:
     buf = BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
@@ -43,3 +46,20 @@ def build_summary_pdf(report: Dict) -> bytes:
     c.showPage()
     c.save()
     return buf.getvalue()
+
+
+# Formats accepted by `render_report` (also the file extensions)
+REPORT_FORMATS = ("html", "pdf", "docx")
+
+
+def render_report(fmt: str, report: Dict) -> bytes:
+    """The report as `fmt` ("html", "pdf" or "docx") file bytes."""
+    if fmt == "html":
+        from src.core.html_report import build_html_report
+        return build_html_report(report).encode("utf-8")
+    if fmt == "pdf":
+        return build_summary_pdf(report)
+    if fmt == "docx":
+        from src.core.word_report import build_detailed_docx
+        return build_detailed_docx(report)
+    raise ValueError(f"Unknown report format {fmt!r}; use {', '.join(REPORT_FORMATS)}")
@@ -0,0 +1,368 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple, NamedTuple
+from types import MappingProxyType
+import hashlib
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+
+import yaml
+
+from src.core.cache import CACHE_DIR, PROJECT_ROOT
+from src.core.docx_utils import lowered_text
+from src.rag.retrieve import citation_tuple
+
+Span = Tuple[int, int]
+# (block, start, end): a paragraph/cell block of the parsed document and character offsets within it
+Location = Tuple[int, int, int]
+
+RULEPACK_PATH = os.environ.get("ADGM_RULEPACK") or os.path.join(PROJECT_ROOT, "src", "rulepacks.yaml")
+# Seconds between checks of the rule-pack file for edits (hot reload)
+RELOAD_INTERVAL = float(os.environ.get("ADGM_RULEPACK_RELOAD_INTERVAL", "2"))
+SEVERITIES = ("High", "Medium", "Low")
+
+# A pattern made only of literal words/punctuation joined by "|" can be matched with
+# plain substring search on the lowercased text instead of a regex.
+_LITERAL_ALTERNATION = re.compile(r"[\w \-:&',/]+(?:\|[\w \-:&',/]+)*")
+
+
+class Rule(NamedTuple):
+    """One deterministic validation rule.
+
+    The issue fires when `present` (if set) matches and `absent` (if set) does
+    not. `check` names the `DOC_CHECKS` function the rule belongs to.
+    """
+    id: str
+    check: str
+    issue: str
+    severity: str
+    suggestion: str
+    citations: Tuple[str, ...]
+    present: Optional[str] = None
+    absent: Optional[str] = None
+
+
+class Issue(NamedTuple):
+    """One finding. Rule text and citation tuples are shared with the rule that raised it.
+
+    Issues stay in this form through validation and become the legacy dict
+    (`to_dict`) only in the report handed to the UI and report builders.
+    `location` is where the rule's `present` pattern matched, if it has one.
+    """
+    issue: str
+    severity: str
+    suggestion: str
+    citations: Tuple[str, ...]
+    rule_id: str = ""
+    document: Optional[str] = None
+    location: Optional[Location] = None
+
+    def for_document(self, document: str, location: Optional[Location] = None) -> "Issue":
+        return Issue(self.issue, self.severity, self.suggestion, self.citations, self.rule_id, document, location)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"issue": self.issue, "severity": self.severity, "suggestion": self.suggestion,
+             "citations": list(self.citations)}
+        if self.document is not None:
+            d["document"] = self.document
+            d["location"] = self.location
+        return d
+
+
+def _lower_pattern(source: str) -> str:
+    """Lowercase a regex source without touching escapes such as \\S or \\D."""
+    out = []
+    i = 0
+    while i < len(source):
+        ch = source[i]
+        if ch == "\\" and i + 1 < len(source):
+            out.append(source[i:i + 2])
+            i += 2
+            continue
+        out.append(ch.lower())
+        i += 1
+    return "".join(out)
+
+
+class CompiledPattern:
+    """A rule pattern compiled once to match against lowercased document text."""
+
+    __slots__ = ("source", "literals", "regex")
+
+    def __init__(self, source: str):
+        self.source = source
+        if _LITERAL_ALTERNATION.fullmatch(source):
+            self.literals = tuple(source.lower().split("|"))
+            self.regex = None
+        else:
+            self.literals = ()
+            self.regex = re.compile(_lower_pattern(source))
+
+    def search(self, lowered: str) -> Optional[Span]:
+        """Leftmost match span in `lowered`, with regex alternation semantics."""
+        if self.regex is not None:
+            m = self.regex.search(lowered)
+            return m.span() if m else None
+        best = None
+        for lit in self.literals:
+            pos = lowered.find(lit)
+            if pos != -1 and (best is None or pos < best[0]):
+                best = (pos, pos + len(lit))
+        return best
+
+
+class DocumentType(NamedTuple):
+    name: str
+    patterns: Tuple[str, ...]
+    checks: Tuple[str, ...]
+
+
+class Process(NamedTuple):
+    name: str
+    required: Tuple[str, ...]
+    detect: Tuple[str, ...]
+
+
+class RuleEngine:
+    """Immutable rule pack, compiled once and evaluated per document.
+
+    Holds the process definitions, the ordered document-type patterns and the
+    validation rules. Each document is lowercased once and every pattern needed
+    by its checks is evaluated against that single copy: literal keyword
+    alternations use C-level substring search and the rest use regexes
+    precompiled without re.I, so the regex engine can use its literal-prefix
+    fast path.
+    """
+
+    def __init__(self, rules: Sequence[Rule], document_types: Sequence[DocumentType] = (),
+                 processes: Sequence[Process] = (), version: str = ""):
+        # Rule ids, check names and severities are compared and hashed per finding
+        self.rules: Tuple[Rule, ...] = tuple(
+            r._replace(id=sys.intern(r.id), check=sys.intern(r.check), severity=sys.intern(r.severity))
+            for r in rules
+        )
+        self.document_types: Tuple[DocumentType, ...] = tuple(document_types)
+        self.processes: Tuple[Process, ...] = tuple(processes)
+        self.version = version
+        self._type_patterns = tuple(
+            (dt.name, tuple(CompiledPattern(p) for p in dt.patterns)) for dt in self.document_types
+        )
+        self._checks_by_type = MappingProxyType({dt.name: dt.checks for dt in self.document_types})
+        by_check: Dict[str, List[Rule]] = {}
+        for r in self.rules:
+            by_check.setdefault(r.check, []).append(r)
+        self._by_check: Dict[str, Tuple[Rule, ...]] = {k: tuple(v) for k, v in by_check.items()}
+        self._by_id: Dict[str, Rule] = {r.id: r for r in self.rules}
+        self._issue_records: Dict[str, Issue] = {}
+        self._patterns: Dict[str, CompiledPattern] = {}
+        self._check_patterns: Dict[Tuple[str, ...], Tuple[CompiledPattern, ...]] = {}
+        for r in self.rules:
+            for src in (r.present, r.absent):
+                if src and src not in self._patterns:
+                    self._patterns[src] = CompiledPattern(src)
+
+    def __reduce__(self):
+        # Rebuilt from its declarative parts; compiled patterns are recreated on load
+        return (RuleEngine, (self.rules, self.document_types, self.processes, self.version))
+
+    @property
+    def doc_patterns(self) -> Dict[str, List[str]]:
+        return {dt.name: list(dt.patterns) for dt in self.document_types}
+
+    @property
+    def process_rules(self) -> Dict[str, List[str]]:
+        return {p.name: list(p.detect) for p in self.processes}
+
+    @property
+    def required_docs(self) -> Dict[str, List[str]]:
+        return {p.name: list(p.required) for p in self.processes}
+
+    @property
+    def citation_keys(self) -> List[str]:
+        return list(dict.fromkeys(key for r in self.rules for key in r.citations))
+
+    def identify(self, name: str, content: str) -> str:
+        """First document type with a pattern in the file name or the text, else "Unknown"."""
+        n = name.lower()
+        c = content.lower()
+        for dtype, patterns in self._type_patterns:
+            for p in patterns:
+                if p.search(n) is not None or p.search(c) is not None:
+                    return dtype
+        return "Unknown"
+
+    def checks_for(self, dtype: str) -> Tuple[str, ...]:
+        return self._checks_by_type.get(dtype, ())
+
+    def rules_for(self, check: str) -> Optional[Tuple[Rule, ...]]:
+        return self._by_check.get(check)
+
+    def _patterns_for(self, checks: Tuple[str, ...]) -> Tuple[CompiledPattern, ...]:
+        patterns = self._check_patterns.get(checks)
+        if patterns is None:
+            seen: Dict[str, CompiledPattern] = {}
+            for check in checks:
+                for r in self._by_check.get(check, ()):
+                    for src in (r.present, r.absent):
+                        if src:
+                            seen.setdefault(src, self._patterns[src])
+            patterns = self._check_patterns[checks] = tuple(seen.values())
+        return patterns
+
+    def scan(self, text: str, checks: Sequence[str]) -> Dict[str, Optional[Span]]:
+        """Match every pattern used by `checks` once; returns pattern source -> span of `text` or None."""
+        lowered = lowered_text(text)
+        return {p.source: p.search(lowered) for p in self._patterns_for(tuple(checks))}
+
+    def located(self, check: str, matches: Dict[str, Optional[Span]]) -> List[Tuple[str, Optional[Span]]]:
+        """(rule id, span of its `present` match or None) for the rules of `check` that raise an issue."""
+        found = []
+        for r in self._by_check.get(check, ()):
+            span = matches[r.present] if r.present else None
+            if r.present and span is None:
+                continue
+            if r.absent and matches[r.absent] is not None:
+                continue
+            found.append((r.id, span))
+        return found
+
+    def fired(self, check: str, matches: Dict[str, Optional[Span]]) -> List[str]:
+        """Ids of the rules of `check` that raise an issue, given the output of `scan`."""
+        return [rule_id for rule_id, _ in self.located(check, matches)]
+
+    def issue(self, rule_id: str) -> Optional[Issue]:
+        """The shared `Issue` for a rule, rebuilt only when its citations change."""
+        rule = self._by_id.get(rule_id)
+        if rule is None:
+            return None
+        cites = citation_tuple(rule.citations)
+        record = self._issue_records.get(rule_id)
+        if record is None or record.citations is not cites:
+            record = self._issue_records[rule_id] = Issue(rule.issue, rule.severity, rule.suggestion, cites, rule.id)
+        return record
+
+    def issues(self, check: str, matches: Dict[str, Optional[Span]]) -> List[Issue]:
+        """Issues raised by the rules of `check`, given the output of `scan`."""
+        return [self.issue(rule_id) for rule_id in self.fired(check, matches)]
+
+    def run_check(self, check: str, text: str) -> List[Dict[str, Any]]:
+        return [it.to_dict() for it in self.issues(check, self.scan(text, [check]))]
+
+
+def _require(cond: bool, message: str) -> None:
+    if not cond:
+        raise ValueError(f"Invalid rule pack: {message}")
+
+
+def _compile_check(source: str, where: str) -> None:
+    try:
+        CompiledPattern(source)
+    except re.error as e:
+        raise ValueError(f"Invalid rule pack: bad pattern in {where}: {e}") from e
+
+
+def parse_rulepack(data: Dict[str, Any], version: str = "") -> RuleEngine:
+    """Validate a parsed rulepacks.yaml mapping and build its `RuleEngine`."""
+    _require(isinstance(data, dict), "top level must be a mapping")
+    processes = []
+    for name, spec in (data.get("processes") or {}).items():
+        spec = spec or {}
+        required = tuple(spec.get("required") or ())
+        processes.append(Process(name, required, tuple(spec.get("detect") or required)))
+
+    document_types = []
+    for name, spec in (data.get("document_types") or {}).items():
+        spec = spec or {}
+        patterns = tuple(spec.get("patterns") or ())
+        for p in patterns:
+            _compile_check(p, f"document type '{name}'")
+        document_types.append(DocumentType(name, patterns, tuple(spec.get("checks") or ())))
+
+    checks = data.get("checks") or {}
+    rules = []
+    for check, entries in checks.items():
+        for i, entry in enumerate(entries or []):
+            where = f"checks.{check}[{i}]"
+            for key in ("id", "issue", "severity", "suggestion"):
+                _require(key in entry, f"{where} is missing '{key}'")
+            _require(entry["severity"] in SEVERITIES, f"{where} severity must be one of {', '.join(SEVERITIES)}")
+            _require(bool(entry.get("present") or entry.get("absent")), f"{where} needs 'present' and/or 'absent'")
+            for key in ("present", "absent"):
+                if entry.get(key):
+                    _compile_check(entry[key], where)
+            rules.append(Rule(
+                str(entry["id"]), check, entry["issue"], entry["severity"], entry["suggestion"],
+                tuple(entry.get("citations") or ()), entry.get("present"), entry.get("absent"),
+            ))
+    for dt in document_types:
+        for check in dt.checks:
+            _require(check in checks, f"document type '{dt.name}' uses unknown check '{check}'")
+    return RuleEngine(rules, document_types, processes, version)
+
+
+def load_rulepack(path: str = RULEPACK_PATH, cache_dir: Optional[str] = None) -> RuleEngine:
+    """Compile the rule pack at `path`, reusing a pickled engine keyed on the file hash."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir or os.path.join(CACHE_DIR, "rulepacks"), f"{version}.pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            engine = pickle.load(f)
+        if isinstance(engine, RuleEngine) and engine.version == version:
+            return engine
+    except Exception:
+        pass
+    engine = parse_rulepack(yaml.safe_load(raw) or {}, version)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(engine, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+    return engine
+
+
+_engine: Optional[RuleEngine] = None
+_engine_stamp = None
+_engine_checked = 0.0
+_engine_lock = threading.Lock()
+
+
+def get_engine(force_check: bool = False) -> RuleEngine:
+    """The current rule engine, reloaded when rulepacks.yaml changes on disk.
+
+    The file is stat-ed at most every RELOAD_INTERVAL seconds. If an edited
+    pack fails to load, the previous engine keeps serving and the error is
+    reported once per edit.
+    """
+    global _engine, _engine_stamp, _engine_checked
+    now = time.monotonic()
+    if _engine is not None and not force_check and now - _engine_checked < RELOAD_INTERVAL:
+        return _engine
+    with _engine_lock:
+        _engine_checked = now
+        try:
+            st = os.stat(RULEPACK_PATH)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if _engine is not None and stamp == _engine_stamp:
+            return _engine
+        try:
+            _engine = load_rulepack(RULEPACK_PATH)
+        except Exception as e:
+            if _engine is None:
+                raise
+            print(f"Rule pack reload failed, keeping version {_engine.version}: {e}")
+        _engine_stamp = stamp
+        return _engine
+
+
+def reload_engine() -> RuleEngine:
+    """Re-read rulepacks.yaml now instead of waiting for the next reload check."""
+    return get_engine(force_check=True)
@@ -1,159 +1,157 @@
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import re
 
-from src.rag.retrieve import cite_rules
-
-# Minimal deterministic checks; citations are attached via RAG stub
-REQUIRED_DOCS = {
-    "Company Incorporation": [
-        "Articles of Association",
-        "Shareholder Resolution",
-        "Register of Members and Directors",
-        "UBO Declaration",
-        "Incorporation Application",
-    ],
-    "Employment & HR": ["Employment Contract"],
-}
+from src.core import metrics
+from src.core.cache import analysis_cache
+from src.core.docx_utils import block_offsets, locate_span
+from src.core.parallel import pmap
+from src.core.rules import Issue, Span, get_engine
+from src.rag.retrieve import citation_tuple, resolve_citations
+
+# Citation keys used by the cross-document checks below
+CROSS_DOC_CITATIONS = ["companies_best_practices_drafting", "companies_registrations_registered_office"]
+
+# Minimal deterministic checks; citations are grounded in reference passages.
+# Required documents and the rules behind each check are declared in src/rulepacks.yaml.
 
 
+@metrics.timed()
 def check_jurisdiction(text: str) -> List[Dict[str, Any]]:
-    issues = []
-    if re.search(r"uae federal court|mainland|dubai courts|abu dhabi courts", text, re.I):
-        issues.append({
-            "issue": "Jurisdiction refers outside ADGM",
-            "severity": "High",
-            "suggestion": "Replace forum with ADGM Courts and ADGM governing law, as applicable.",
-            "citations": cite_rules(["companies_regulations_formation", "adgm_courts"]),
-        })
-    return issues
+    return get_engine().run_check("check_jurisdiction", text)
 
 
+@metrics.timed()
 def check_registered_office(text: str) -> List[Dict[str, Any]]:
-    if not re.search(r"registered\s+office|al maryah|adgm", text, re.I):
-        return [{
-            "issue": "No ADGM registered office found",
-            "severity": "High",
-            "suggestion": "Add the ADGM registered office address in Abu Dhabi Global Market.",
-            "citations": cite_rules(["companies_registrations_registered_office", "checklist_registered_office"]),
-        }]
-    return []
+    return get_engine().run_check("check_registered_office", text)
 
 
+@metrics.timed()
 def check_signature_block(text: str) -> List[Dict[str, Any]]:
-    patterns = [r"signed by", r"signature", r"name:\s+", r"date:\s+"]
-    if not any(re.search(p, text, re.I) for p in patterns):
-        return [{
-            "issue": "Missing signature/date block",
-            "severity": "Medium",
-            "suggestion": "Add Name, Title, Signature, Date at the end.",
-            "citations": cite_rules(["checklist_evidence_of_appointment"]),
-        }]
-    return []
+    return get_engine().run_check("check_signature_block", text)
 
 
+@metrics.timed()
 def check_governing_law(text: str) -> List[Dict[str, Any]]:
-    issues = []
-    # If governing law appears, ensure it's ADGM or Abu Dhabi Global Market
-    if re.search(r"governing\s+law|law\s+of", text, re.I):
-        if not re.search(r"adgm|abu dhabi global market", text, re.I):
-            issues.append({
-                "issue": "Governing law not set to ADGM",
-                "severity": "High",
-                "suggestion": "Set governing law to Abu Dhabi Global Market (ADGM) where appropriate.",
-                "citations": cite_rules(["companies_regulations_formation", "adgm_courts"]),
-            })
-    return issues
+    return get_engine().run_check("check_governing_law", text)
 
 
+@metrics.timed()
 def check_defined_terms_section(text: str) -> List[Dict[str, Any]]:
-    if not re.search(r"definitions|interpretation", text, re.I):
-        return [{
-            "issue": "No Definitions/Interpretation section",
-            "severity": "Medium",
-            "suggestion": "Add a Definitions/Interpretation section to standardize capitalized terms.",
-            "citations": cite_rules(["companies_best_practices_drafting"]),
-        }]
-    return []
+    return get_engine().run_check("check_defined_terms_section", text)
 
 
+@metrics.timed()
 def check_clause_numbering(text: str) -> List[Dict[str, Any]]:
-    # Heuristic: expect at least some numbered clauses like 1., 1.1 or similar
-    if not re.search(r"\b\d+\.(?:\d+\.)?\s", text):
-        return [{
-            "issue": "Clauses not clearly numbered",
-            "severity": "Low",
-            "suggestion": "Number clauses (e.g., 1., 1.1, 1.2) for readability and cross-referencing.",
-            "citations": cite_rules(["companies_best_practices_drafting"]),
-        }]
-    return []
+    return get_engine().run_check("check_clause_numbering", text)
 
 
+@metrics.timed()
 def check_signing_authority(text: str) -> List[Dict[str, Any]]:
-    if not re.search(r"authori[sz]ed\s+signator|director|company secretary", text, re.I):
-        return [{
-            "issue": "Signing authority not evident",
-            "severity": "Medium",
-            "suggestion": "Identify the authorised signatory (e.g., Director) in the execution block.",
-            "citations": cite_rules(["checklist_evidence_of_appointment"]),
-        }]
-    return []
+    return get_engine().run_check("check_signing_authority", text)
 
 
+@metrics.timed()
 def employment_minimums(text: str) -> List[Dict[str, Any]]:
-    reqs = {
-        "names": r"employee|employer",
-        "start": r"start date|commencement",
-        "job": r"job title|position",
-        "wages": r"wage|salary|compensation",
-        "pay_period": r"pay period|monthly|weekly",
-        "hours": r"hours of work|working hours",
-        "leave": r"annual leave|vacation|sick leave",
-        "notice": r"notice|termination",
-        "place": r"place of work|remote",
-        "grievance": r"disciplinary|grievance",
-    }
-    issues = []
-    for key, pat in reqs.items():
-        if not re.search(pat, text, re.I):
-            issues.append({
-                "issue": f"Employment: missing {key.replace('_', ' ')}",
-                "severity": "High" if key in {"wages", "pay_period", "leave", "notice"} else "Medium",
-                "suggestion": f"Add {key.replace('_', ' ')} per Employment Regulations 2024.",
-                "citations": cite_rules(["employment_regulations_minimums", "employment_standard_template"]),
-            })
-    return issues
+    return get_engine().run_check("employment_minimums", text)
 
 
-DOC_CHECKS = {
-    "Articles of Association": [check_jurisdiction, check_registered_office, check_governing_law, check_defined_terms_section, check_clause_numbering],
-    "Shareholder Resolution": [check_signature_block, check_signing_authority],
-    "Board Resolution": [check_signature_block, check_signing_authority],
-    "Incorporation Application": [check_registered_office, check_governing_law],
-    "UBO Declaration": [],
-    "Register of Members and Directors": [],
-    "Employment Contract": [employment_minimums],
+_generated_checks: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+    fn.__name__: fn
+    for fn in (check_jurisdiction, check_registered_office, check_signature_block, check_governing_law,
+               check_defined_terms_section, check_clause_numbering, check_signing_authority, employment_minimums)
 }
 
 
-def analyze_bundle(proc_info: Dict[str, Any]) -> Dict[str, Any]:
-    process = proc_info.get("process", "Unknown")
-    docs = proc_info.get("documents", {})
-    types = [d["type"] for d in docs.values()]
+def check_function(name: str) -> Callable[[str], List[Dict[str, Any]]]:
+    """Callable for a rule-pack check: the named function above, or one generated for new checks."""
+    if name not in _generated_checks:
+        def run(text: str) -> List[Dict[str, Any]]:
+            return get_engine().run_check(name, text)
+        run.__name__ = run.__qualname__ = name
+        _generated_checks[name] = metrics.timed()(run)
+    return _generated_checks[name]
 
-    required = REQUIRED_DOCS.get(process, [])
-    missing = [r for r in required if r not in types]
 
-    issues: List[Dict[str, Any]] = []
-    for name, meta in docs.items():
-        dtype = meta["type"]
-        text = meta["text"]
-        for check in DOC_CHECKS.get(dtype, []):
-            found = check(text)
-            for f in found:
-                f.update({"document": name, "location": None})
-            issues.extend(found)
-
-    # Cross-document consistency checks
+_ENGINE_VIEWS = {
+    "REQUIRED_DOCS": lambda engine: engine.required_docs,
+    "DOC_CHECKS": lambda engine: {dt.name: [check_function(c) for c in dt.checks] for dt in engine.document_types},
+}
+
+
+def __getattr__(name: str):
+    # REQUIRED_DOCS / DOC_CHECKS stay importable as snapshots of the current rule pack
+    if name in _ENGINE_VIEWS:
+        return _ENGINE_VIEWS[name](get_engine())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@metrics.timed("document_checks")
+def fired_rules(dtype: str, text: str) -> List[Tuple[str, Optional[Span]]]:
+    """(rule id, matched span of `text` or None) for each rule that fires when the checks for `dtype` scan `text` once."""
+    engine = get_engine()
+    checks = engine.checks_for(dtype)
+    matches = engine.scan(text, checks)
+    found: List[Tuple[str, Optional[Span]]] = []
+    for check in checks:
+        found.extend(engine.located(check, matches))
+    return found
+
+
+def evaluate_checks(dtype: str, text: str) -> List[Issue]:
+    """Issues raised by the checks registered for `dtype` over `text`."""
+    return [it for it, _ in _issues(fired_rules(dtype, text))]
+
+
+def _issues(fired: List[Tuple[str, Optional[Span]]],
+            records: Optional[Dict[str, Optional[Issue]]] = None) -> List[Tuple[Issue, Optional[Span]]]:
+    """The engine's shared issue records for `fired` rule ids, looked up once per id in `records`, with their spans."""
+    engine = get_engine()
+    if records is None:
+        records = {}
+    found = []
+    for rule_id, span in fired:
+        if rule_id not in records:
+            records[rule_id] = engine.issue(rule_id)
+        if records[rule_id] is not None:
+            found.append((records[rule_id], span))
+    return found
+
+
+def run_document_checks(dtype: str, text: str, digest: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run the `DOC_CHECKS` for one document, reusing cached output when `digest` is known."""
+    return [it.to_dict() for it, _ in _checks_for_documents([(dtype, text, digest)])[0]]
+
+
+def _checks_for_documents(jobs: List[Tuple[str, str, Optional[str]]],
+                          workers: Optional[int] = None) -> List[List[Tuple[Issue, Optional[Span]]]]:
+    """Per-document (issue, span) pairs for (dtype, text, digest) jobs; cache misses fan out over `workers`.
+
+    Workers and the cache deal only in rule ids and match spans; the issues (and
+    their citations) are the engine's shared records.
+    """
+    fired: List[Optional[List[Tuple[str, Optional[Span]]]]] = []
+    pending = []
+    for i, (dtype, text, digest) in enumerate(jobs):
+        cached = None
+        if digest:
+            cached = ((analysis_cache.get(digest) or {}).get("issues") or {}).get(dtype)
+        fired.append(cached)
+        if cached is None:
+            pending.append(i)
+    outputs = pmap(fired_rules, [jobs[i][:2] for i in pending], workers)
+    for i, found in zip(pending, outputs):
+        dtype, _, digest = jobs[i]
+        if digest:
+            analysis_cache.update(digest, issues={dtype: found})
+        fired[i] = found
+    records: Dict[str, Optional[Issue]] = {}
+    return [_issues(ids, records) for ids in fired]
+
+
+@metrics.timed("cross_document")
+def cross_document_issues(docs: Dict[str, Dict[str, Any]]) -> List[Issue]:
+    """Party, date and registered-office mismatches between the documents of a bundle."""
+    issues: List[Issue] = []
     try:
         parties = []
         dates = []
@@ -186,40 +184,93 @@ def analyze_bundle(proc_info: Dict[str, Any]) -> Dict[str, Any]:
             role_to_values.setdefault(role, set()).add(norm_party(value))
         for role, vals in role_to_values.items():
             if len(vals) > 1:
-                issues.append({
-                    "issue": f"Cross-document mismatch: {role} names differ",
-                    "severity": "Medium",
-                    "suggestion": f"Align the {role} name across all documents: {', '.join(sorted(vals))}.",
-                    "citations": cite_rules(["companies_best_practices_drafting"]),
-                })
+                issues.append(Issue(
+                    f"Cross-document mismatch: {role} names differ",
+                    "Medium",
+                    f"Align the {role} name across all documents: {', '.join(sorted(vals))}.",
+                    citation_tuple(("companies_best_practices_drafting",)),
+                    "cross_document_parties",
+                ))
 
         # Dates (effective/commencement) consistency heuristic
         unique_dates = set([d for _, d in dates])
         if len(unique_dates) > 1 and len(unique_dates) <= 6:
-            issues.append({
-                "issue": "Cross-document mismatch: dates are inconsistent",
-                "severity": "Low",
-                "suggestion": f"Confirm effective/commencement dates; found: {', '.join(sorted(unique_dates))}.",
-                "citations": cite_rules(["companies_best_practices_drafting"]),
-            })
+            issues.append(Issue(
+                "Cross-document mismatch: dates are inconsistent",
+                "Low",
+                f"Confirm effective/commencement dates; found: {', '.join(sorted(unique_dates))}.",
+                citation_tuple(("companies_best_practices_drafting",)),
+                "cross_document_dates",
+            ))
 
         # Registered office/address consistency
         addr_values = set([v for _, _, v in addresses])
         if addr_values and len(addr_values) > 1:
-            issues.append({
-                "issue": "Cross-document mismatch: registered office/address differs",
-                "severity": "Medium",
-                "suggestion": f"Confirm the registered office/address across documents: {', '.join(sorted(addr_values))}.",
-                "citations": cite_rules(["companies_registrations_registered_office"]),
-            })
+            issues.append(Issue(
+                "Cross-document mismatch: registered office/address differs",
+                "Medium",
+                f"Confirm the registered office/address across documents: {', '.join(sorted(addr_values))}.",
+                citation_tuple(("companies_registrations_registered_office",)),
+                "cross_document_address",
+            ))
     except Exception:
         # Best-effort; ignore extraction failures
         pass
+    return issues
+
+
+@metrics.timed("validate")
+def analyze_bundle(proc_info: Dict[str, Any], use_cache: bool = True, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Validate a classified bundle.
+
+    Per-document checks are the map step (cached, optionally across `workers`
+    processes); missing documents, cross-document consistency and scoring are
+    the reduce step and always run here.
+    """
+    process = proc_info.get("process", "Unknown")
+    docs = proc_info.get("documents", {})
+    types = [d["type"] for d in docs.values()]
+
+    engine = get_engine()
+    required = engine.required_docs.get(process, [])
+    missing = [r for r in required if r not in types]
+    # Ground every citation the bundle can raise in one batch-encoded search
+    resolve_citations(engine.citation_keys + CROSS_DOC_CITATIONS)
+
+    issues: List[Issue] = []
+    parsed = proc_info.get("parsed") or {}
+    # Blocks past a document's paragraphs are table cells; the report builders number them apart
+    paragraph_counts: Dict[str, int] = {}
+    jobs = [(meta["type"], meta["text"], meta.get("sha256") if use_cache else None) for meta in docs.values()]
+    for (name, meta), found in zip(docs.items(), _checks_for_documents(jobs, workers)):
+        doc = parsed.get(name)
+        lengths = offsets = None
+        for it, span in found:
+            location = None
+            if span is not None:
+                if doc is not None:
+                    location = doc.locate(*span)
+                else:
+                    if lengths is None:
+                        # Classified documents carry their block lengths; plain text is one block per line
+                        lengths = meta.get("blocks") or [len(line) for line in meta["text"].split("\n")]
+                        offsets = block_offsets(lengths)
+                    location = locate_span(lengths, offsets, *span)
+            issues.append(it.for_document(name, location))
+        if doc is not None:
+            paragraph_counts[name] = len(doc.paragraphs)
+        elif "blocks" in meta:
+            paragraph_counts[name] = meta.get("paragraphs", len(meta["blocks"]))
+        else:
+            paragraph_counts[name] = meta["text"].count("\n") + 1
+
+    issues.extend(cross_document_issues(docs))
+    metrics.count("issues_found", len(issues))
 
     # Compute a simple compliance score (0-100)
     score = 100
     for it in issues:
-        sev = (it.get('severity') or '').lower()
+        sev = (it.severity or '').lower()
         if sev == 'high':
             score -= 8
         elif sev == 'medium':
@@ -237,7 +288,9 @@ def analyze_bundle(proc_info: Dict[str, Any]) -> Dict[str, Any]:
         "documents_uploaded": len(docs),
         "required_documents": len(required),
         "missing_documents": missing,
-        "issues_found": issues,
+        # Issues leave the validator as the dicts the UI and report builders expect
+        "issues_found": [it.to_dict() for it in issues],
+        "paragraph_counts": paragraph_counts,
         "compliance_score": score,
     }
     return report
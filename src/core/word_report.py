@@ -1,6 +1,10 @@
 from typing import Dict, Any, List
 from docx import Document
 
+from src.core import metrics
+
+
+@metrics.timed("report_docx")
 def build_detailed_docx(report: Dict[str, Any]) -> bytes:
     doc = Document()
     doc.add_heading('ADGM Corporate Agent - Detailed Analysis', 0)
@@ -0,0 +1,114 @@
+"""Hybrid reference retrieval: TF-IDF and dense passages fused with reciprocal rank fusion.
+
+Exact legal terms ("registered office", "UBO") are carried by the lexical index
+in `simple_retriever`; paraphrases by the FAISS passages in `semantic`. Both
+run concurrently for a batch of queries and their document rankings are fused
+with RRF, so latency is the slower of the two rather than their sum. Fused
+results are cached per normalized query until either index changes.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from src.rag import semantic, simple_retriever
+from src.rag.lexical import tokenize
+
+# Standard RRF damping constant: score = sum(1 / (RRF_K + rank))
+RRF_K = 60
+# Candidates fetched from each retriever per requested result
+DEPTH_FACTOR = 4
+CACHE_SIZE = 1024
+
+
+class HybridHit(NamedTuple):
+    source: str
+    score: float
+    # Best dense passage from this source, when the dense path retrieved one
+    passage: Optional[str]
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-retrieval")
+_cache: "OrderedDict[str, Tuple[int, List[HybridHit]]]" = OrderedDict()
+_cache_version: Optional[Tuple[str, str]] = None
+_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+def index_version() -> Tuple[str, str]:
+    """Changes whenever either underlying index changes, including when a newer one is loaded from disk."""
+    return simple_retriever.get_index().version, semantic.index_version()
+
+
+def fuse(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Reciprocal rank fusion of ranked source lists, best first (ties by source name)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, source in enumerate(ranking, 1):
+            scores[source] = scores.get(source, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _lexical(queries: List[str], depth: int) -> List[List[str]]:
+    index = simple_retriever.get_index()
+    if not len(index):
+        return [[] for _ in queries]
+    # Zero-score padding is not evidence of relevance
+    return [[name for score, name in hits if score > 0] for hits in index.search_many(queries, depth)]
+
+
+def _dense(queries: List[str], depth: int) -> List[List[semantic.Passage]]:
+    return semantic.search_many(queries, depth)
+
+
+def _fused(lexical: List[str], passages: List[semantic.Passage]) -> List[HybridHit]:
+    best: Dict[str, str] = {}
+    dense: List[str] = []
+    for p in passages:
+        if p.source not in best:
+            best[p.source] = p.text
+            dense.append(p.source)
+    return [HybridHit(source, score, best.get(source)) for source, score in fuse([lexical, dense])]
+
+
+def search_many(queries: List[str], k: int = 3) -> List[List[HybridHit]]:
+    """Top-k fused hits per query; uncached queries are run through both retrievers as one batch."""
+    global _cache_version
+    keys = [normalize_query(q) for q in queries]
+    version = index_version()
+    results: Dict[str, List[HybridHit]] = {}
+    with _lock:
+        if version != _cache_version:
+            _cache.clear()
+            _cache_version = version
+        for key in keys:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] >= k:
+                results[key] = entry[1]
+                _cache.move_to_end(key)
+    misses = [key for key in dict.fromkeys(keys) if key not in results]
+    if misses:
+        depth = max(k, 1) * DEPTH_FACTOR
+        lexical = _executor.submit(_lexical, misses, depth)
+        dense = _executor.submit(_dense, misses, depth)
+        for key, lex, passages in zip(misses, lexical.result(), dense.result()):
+            results[key] = _fused(lex, passages)
+        with _lock:
+            for key in misses:
+                _cache[key] = (k, results[key])
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return [results[key][:k] for key in keys]
+
+
+def search(query: str, k: int = 3) -> List[HybridHit]:
+    return search_many([query], k)[0]
+
+
+def retrieve(query: str, k: int = 3) -> List[str]:
+    """Same shape as `simple_retriever.retrieve`, ranked by the fused score."""
+    return [f"[REF] {hit.source}" for hit in search(query, k)]
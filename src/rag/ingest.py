@@ -0,0 +1,279 @@
+"""Incremental ingestion of references/ into the lexical and dense indexes.
+
+Each pass compares every reference file against the manifest kept with the
+dense index: unchanged (mtime, size) signatures are skipped without reading,
+and files whose SHA-256 still matches only get their signature refreshed. New
+or edited files are extracted (TXT, PDF, DOCX), chunked by section heading and
+embedded outside any index lock; their old passages are then swapped for the
+new ones in one short update. The TF-IDF postings (one document per file, same
+extracted text) are synced from the same pass and saved for every process;
+queries only ever load them.
+
+    python -m src.rag.ingest              # ingest what changed
+    python -m src.rag.ingest --full       # re-embed everything
+    python -m src.rag.ingest --download   # fetch the embedding model first
+
+The app starts `start_background()` once per process; queries keep serving the
+previous index while a pass runs.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from src.rag import semantic, simple_retriever
+from src.rag.lexical import LexicalIndex
+
+REF_DIR = simple_retriever.REF_DIR
+SOURCE_EXTENSIONS = (".txt", ".pdf", ".docx")
+# Passages are whole lines grouped up to about this many words within one section
+CHUNK_WORDS = 120
+# Seconds between background passes
+INGEST_INTERVAL = float(os.environ.get("ADGM_INGEST_INTERVAL", "60"))
+
+# Section headings: "PART 2", "Article 5 – Directors", "3.1 Registered office", or short ALL-CAPS lines
+_HEADING = re.compile(
+    r"(?:(?i:part|chapter|article|section|schedule|clause|regulation|annex)\s+[0-9IVXLCivxlc]+[A-Za-z]?\b[^.]{0,80}"
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z][^.]{0,80}"
+    r"|[A-Z][A-Z0-9 ,&'()/\-–]{2,80})"
+)
+_HEADING_MAX_WORDS = 12
+
+
+def list_sources(ref_dir: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+    """Indexable reference files and their (mtime_ns, size) signatures."""
+    ref_dir = ref_dir or REF_DIR
+    sources: Dict[str, Tuple[int, int]] = {}
+    if not os.path.isdir(ref_dir):
+        return sources
+    with os.scandir(ref_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.lower().endswith(SOURCE_EXTENSIONS):
+                st = entry.stat()
+                sources[entry.name] = (st.st_mtime_ns, st.st_size)
+    return sources
+
+
+def extract_text(name: str, data: bytes) -> str:
+    """Plain text of a reference file's bytes; empty when it cannot be read."""
+    ext = os.path.splitext(name)[1].lower()
+    try:
+        if ext == ".txt":
+            return data.decode("utf-8", errors="ignore")
+        if ext == ".docx":
+            from src.core.docx_utils import iter_docx_blocks
+            return "\n".join(text for _, text in iter_docx_blocks(data))
+        if ext == ".pdf":
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                return ""
+            from io import BytesIO
+            # Font-encoding warnings are irrelevant to plain text extraction
+            logging.getLogger("pypdf").setLevel(logging.ERROR)
+            return "\n".join(page.extract_text() or "" for page in PdfReader(BytesIO(data)).pages)
+    except Exception as e:
+        print(f"Skipping reference {name}: {e}")
+    return ""
+
+
+def is_heading(line: str) -> bool:
+    return len(line.split()) <= _HEADING_MAX_WORDS and not line.endswith((".", ";", ",")) \
+        and _HEADING.fullmatch(line) is not None
+
+
+def chunk_text(text: str, max_words: int = CHUNK_WORDS) -> List[str]:
+    """Group consecutive non-empty lines into passages of at most `max_words` words."""
+    chunks: List[str] = []
+    current: List[str] = []
+    count = 0
+    for line in text.splitlines():
+        words = line.split()
+        if not words:
+            continue
+        # Overlong lines (e.g. PDF pages without line breaks) are split on word boundaries
+        for i in range(0, len(words), max_words):
+            piece = words[i:i + max_words]
+            if current and count + len(piece) > max_words:
+                chunks.append(" ".join(current))
+                current, count = [], 0
+            current.extend(piece)
+            count += len(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_sections(text: str, max_words: int = CHUNK_WORDS) -> List[str]:
+    """Split at section headings, then chunk each section; every passage is prefixed with its heading."""
+    sections: List[Tuple[str, List[str]]] = []
+    heading, lines = "", []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if is_heading(line):
+            if lines:
+                sections.append((heading, lines))
+                heading, lines = line, []
+            else:
+                # Consecutive headings ("PART 1" / "GENERAL") form one title
+                heading = f"{heading} — {line}" if heading else line
+        else:
+            lines.append(line)
+    if lines or heading:
+        sections.append((heading, lines))
+
+    chunks: List[str] = []
+    for heading, lines in sections:
+        for piece in chunk_text("\n".join(lines), max_words) or [""]:
+            chunk = f"{heading}\n{piece}" if heading and piece else heading or piece
+            if chunk:
+                chunks.append(chunk)
+    return chunks
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def ingest(ref_dir: Optional[str] = None, full: bool = False, model=None) -> Dict[str, Any]:
+    """One ingestion pass; returns counts of added/updated/removed/unchanged files and timing."""
+    ref_dir = ref_dir or REF_DIR
+    started = time.perf_counter()
+    stats: Dict[str, Any] = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "passages": 0}
+    sources = list_sources(ref_dir)
+    # Each changed file is read and extracted once for both indexes
+    texts: Dict[str, str] = {}
+
+    def load_text(name: str) -> Optional[str]:
+        if name not in texts:
+            data = _read(os.path.join(ref_dir, name))
+            if data is None:
+                return None
+            texts[name] = extract_text(name, data)
+        return texts[name]
+
+    # Lexical postings: only files whose (mtime, size) signature changed are re-tokenized
+    lexical = LexicalIndex() if full else simple_retriever.load_index()
+    if lexical.sync(sources, load_text) or full:
+        simple_retriever.save_index(lexical)
+
+    if model is None:
+        model = semantic.get_model()
+    if model is None:
+        stats["dense"] = semantic.model_error() or "embedding model unavailable"
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    index = semantic.get_index()
+    index.ensure_loaded()
+    index.reload_if_changed()
+    manifest = {} if full else {name: dict(entry) for name, entry in index.files.items()}
+
+    removed = [name for name in manifest if name not in sources]
+    added: List[Tuple[str, Dict[str, Any], List[str], Any]] = []
+    touched: List[Tuple[str, Dict[str, Any]]] = []
+    dim = model.get_sentence_embedding_dimension()
+    for name, (mtime_ns, size) in sorted(sources.items()):
+        known = manifest.get(name)
+        if known and (known["mtime_ns"], known["size"]) == (mtime_ns, size):
+            stats["unchanged"] += 1
+            continue
+        data = _read(os.path.join(ref_dir, name))
+        if data is None:
+            continue
+        entry = {"sha256": hashlib.sha256(data).hexdigest(), "mtime_ns": mtime_ns, "size": size}
+        if known and known["sha256"] == entry["sha256"]:
+            touched.append((name, entry))
+            stats["unchanged"] += 1
+            continue
+        if name not in texts:
+            texts[name] = extract_text(name, data)
+        chunks = chunk_sections(texts[name])
+        vectors = semantic.encode(chunks, model) if chunks else None
+        added.append((name, entry, chunks, vectors))
+        stats["updated" if name in index.files else "added"] += 1
+        stats["passages"] += len(chunks)
+    stats["removed"] = len(removed)
+
+    if full or removed or added or touched:
+        index.apply(removed, added, dim, reset=full)
+        for name, entry in touched:
+            index.touch(name, entry)
+        index.save()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+_ingest_lock = threading.Lock()
+_scheduled = threading.Event()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+last_stats: Dict[str, Any] = {}
+
+
+def run_once(**kwargs) -> Optional[Dict[str, Any]]:
+    """`ingest` unless another pass is already running (then None)."""
+    global last_stats
+    if not _ingest_lock.acquire(blocking=False):
+        return None
+    try:
+        last_stats = ingest(**kwargs)
+        return last_stats
+    except Exception as e:
+        print(f"Reference ingestion failed: {e}")
+        return None
+    finally:
+        _ingest_lock.release()
+
+
+def _loop(interval: float) -> None:
+    while True:
+        run_once()
+        _scheduled.wait(interval)
+        _scheduled.clear()
+
+
+def start_background(interval: float = INGEST_INTERVAL) -> threading.Thread:
+    """Start (once per process) a daemon thread that ingests now and then every `interval` seconds."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_loop, args=(interval,), name="reference-ingest", daemon=True)
+            _worker.start()
+        return _worker
+
+
+def schedule() -> None:
+    """Ask for a pass soon without waiting for it; starts the background thread if needed."""
+    start_background()
+    _scheduled.set()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingest references/ into the lexical and dense indexes.")
+    parser.add_argument("--full", action="store_true",
+                        help="re-extract and re-embed every file (and retrain a quantized index)")
+    parser.add_argument("--download", action="store_true",
+                        help=f"fetch {semantic.MODEL_NAME} into the local model cache if it is not there yet")
+    parser.add_argument("--ref-dir", default=REF_DIR)
+    args = parser.parse_args()
+    model = semantic.get_model(allow_download=args.download)
+    stats = ingest(ref_dir=args.ref_dir, full=args.full, model=model)
+    print(", ".join(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}" for k, v in stats.items()))
+    if model is None:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
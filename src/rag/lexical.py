@@ -0,0 +1,296 @@
+import math
+import os
+import pickle
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from collections import Counter
+
+import numpy as np
+
+INDEX_FORMAT = 1
+# Postings gathered per vectorized pass in batched search
+BATCH_POSTINGS = 1 << 13
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.lower() for t in ''.join(ch if ch.isalnum() else ' ' for ch in text).split() if t]
+
+
+class LexicalIndex:
+    """Incrementally maintained TF-IDF inverted index.
+
+    Postings map each term to {doc_id: term frequency}; per-document norms are
+    cached and recomputed only after the corpus changes. Scoring is the cosine
+    similarity `simple_retriever.retrieve` has always used, computed as a
+    sparse matrix-vector product over a term-id vocabulary so a query only
+    touches the postings of its own terms.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self.signatures: Dict[Hashable, object] = {}
+        self.norms: Dict[Hashable, float] = {}
+        self._dirty = False
+        self._matrix = None
+        # Stamped on every change and saved with the postings, so callers in any process
+        # that loads this index can invalidate results derived from an older one
+        self.version = ""
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def __getstate__(self):
+        return {
+            "format": INDEX_FORMAT,
+            "postings": self.postings,
+            "doc_terms": self.doc_terms,
+            "signatures": self.signatures,
+            "norms": self.norms,
+            "dirty": self._dirty,
+            "version": self.version,
+        }
+
+    def __setstate__(self, state):
+        if state.get("format") != INDEX_FORMAT:
+            raise ValueError("Unsupported lexical index format")
+        self.postings = state["postings"]
+        self.doc_terms = state["doc_terms"]
+        self.signatures = state["signatures"]
+        self.norms = state["norms"]
+        self._dirty = state["dirty"]
+        self._matrix = None
+        # Files written before versions were saved get a fresh stamp on every load
+        self.version = state.get("version") or f"{time.time_ns():x}"
+        self._lock = threading.RLock()
+
+    # -- maintenance -------------------------------------------------------
+
+    def add(self, doc_id: Hashable, text: str, signature: object = None) -> None:
+        with self._lock:
+            if doc_id in self.doc_terms:
+                self.remove(doc_id)
+            tf = Counter(tokenize(text))
+            for term, count in tf.items():
+                self.postings.setdefault(term, {})[doc_id] = count
+            self.doc_terms[doc_id] = tuple(tf)
+            self.signatures[doc_id] = signature
+            self._dirty = True
+            self._matrix = None
+            self.version = f"{time.time_ns():x}"
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            for term in self.doc_terms.pop(doc_id, ()):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+            self.signatures.pop(doc_id, None)
+            self.norms.pop(doc_id, None)
+            self._dirty = True
+            self._matrix = None
+            self.version = f"{time.time_ns():x}"
+
+    def sync(self, sources: Dict[Hashable, object], load_text: Callable[[Hashable], Optional[str]]) -> bool:
+        """Make the index match `sources` ({doc_id: signature}); only changed docs are re-read.
+
+        Files are read before the lock is taken, so searches are held up only
+        for the postings update itself. Returns True when anything changed.
+        """
+        with self._lock:
+            removed = [d for d in self.doc_terms if d not in sources]
+            stale = [d for d, sig in sources.items()
+                     if d not in self.doc_terms or self.signatures.get(d) != sig]
+        texts = [(d, load_text(d)) for d in stale]
+        texts = [(d, text) for d, text in texts if text is not None]
+        if not removed and not texts:
+            return False
+        with self._lock:
+            for doc_id in removed:
+                self.remove(doc_id)
+            for doc_id, text in texts:
+                self.add(doc_id, text, sources[doc_id])
+        return True
+
+    def idf(self, term: str) -> float:
+        n = len(self.doc_terms)
+        return math.log((n + 1) / (1 + len(self.postings.get(term, ())))) + 1.0
+
+    def _refresh_norms(self) -> None:
+        # Document norms depend on corpus-wide document frequencies
+        sums: Dict[Hashable, float] = dict.fromkeys(self.doc_terms, 0.0)
+        for term, docs in self.postings.items():
+            idf = self.idf(term)
+            for doc_id, count in docs.items():
+                w = count * idf
+                sums[doc_id] += w * w
+        self.norms = {d: s ** 0.5 for d, s in sums.items()}
+        self._dirty = False
+
+    # -- querying ----------------------------------------------------------
+
+    def _compile(self) -> "_TermMatrix":
+        if self._dirty:
+            self._refresh_norms()
+        if self._matrix is None:
+            self._matrix = _TermMatrix(self)
+        return self._matrix
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, Hashable]]:
+        """Top-k (score, doc_id), ordered like sorting every document by (score, doc_id) descending."""
+        with self._lock:
+            matrix = self._compile()
+        return matrix.search(Counter(tokenize(query)), k)
+
+    def search_many(self, queries: List[str], k: int = 3) -> List[List[Tuple[float, Hashable]]]:
+        """`search` for every query; distinct queries are tokenized once and scored in batched passes."""
+        with self._lock:
+            matrix = self._compile()
+        # Queries with the same bag of words share a row
+        rows: Dict[frozenset, int] = {}
+        q_tfs: List[Counter] = []
+        row_of = []
+        for query in queries:
+            q_tf = Counter(tokenize(query))
+            key = frozenset(q_tf.items())
+            if key not in rows:
+                rows[key] = len(q_tfs)
+                q_tfs.append(q_tf)
+            row_of.append(rows[key])
+        results = [matrix.top_k(row, k) for row in matrix.batch_scores(q_tfs)]
+        return [results[r] for r in row_of]
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+        except Exception:
+            return None
+        return index if isinstance(index, cls) else None
+
+
+class _TermMatrix:
+    """Immutable term-major (CSC) view of a LexicalIndex used for scoring.
+
+    Column `t` holds the raw term counts of term id `t` in `doc_idx[indptr[t]:indptr[t + 1]]`;
+    documents are numbered in sorted doc_id order so index order breaks score ties.
+    """
+
+    def __init__(self, index: LexicalIndex):
+        self.doc_ids = sorted(index.doc_terms)
+        row = {d: i for i, d in enumerate(self.doc_ids)}
+        self.n_docs = len(self.doc_ids)
+        self.vocab: Dict[str, int] = {}
+        idf, indptr, doc_idx, counts = [], [0], [], []
+        for term, docs in index.postings.items():
+            self.vocab[term] = len(idf)
+            idf.append(index.idf(term))
+            doc_idx.extend(row[d] for d in docs)
+            counts.extend(docs.values())
+            indptr.append(len(doc_idx))
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_idx = np.asarray(doc_idx, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.norms = np.asarray([index.norms[d] for d in self.doc_ids], dtype=np.float64)
+        # idf of a term that no document contains
+        self.unseen_idf = math.log(self.n_docs + 1) + 1.0
+
+    def query_vector(self, q_tf: Counter) -> Tuple[np.ndarray, np.ndarray, float]:
+        """(term ids, query weights, query norm) for the query's in-vocabulary terms."""
+        ids, weights, dq = [], [], 0.0
+        for term, qc in q_tf.items():
+            t = self.vocab.get(term)
+            idf = self.unseen_idf if t is None else float(self.idf[t])
+            q_w = qc * idf
+            dq += q_w * q_w
+            if t is not None:
+                ids.append(t)
+                weights.append(q_w)
+        return np.asarray(ids, dtype=np.int64), np.asarray(weights, dtype=np.float64), dq ** 0.5
+
+    def _postings(self, ids: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(flat posting positions, per-term posting counts, query-weighted contributions)."""
+        starts, ends = self.indptr[ids], self.indptr[ids + 1]
+        lengths = ends - starts
+        # Positions of every posting of every query term, in query-term order
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        pos = offsets + np.arange(lengths.sum())
+        contrib = np.repeat(weights, lengths) * self.counts[pos] * np.repeat(self.idf[ids], lengths)
+        return pos, lengths, contrib
+
+    def dots(self, ids: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Sparse product of the document-term matrix with one query vector."""
+        if not len(ids):
+            return np.zeros(self.n_docs)
+        pos, _, contrib = self._postings(ids, weights)
+        return np.bincount(self.doc_idx[pos], weights=contrib, minlength=self.n_docs)
+
+    def batch_scores(self, q_tfs: List[Counter]) -> Iterator[np.ndarray]:
+        """Score rows for each query, accumulated group by group in vectorized passes.
+
+        Queries are grouped so each pass gathers about BATCH_POSTINGS postings,
+        which keeps the working set cache-resident however large the batch is.
+        """
+        vectors = [self.query_vector(q_tf) for q_tf in q_tfs]
+        group: list = []
+        total = 0
+        for i, vector in enumerate(vectors):
+            ids = vector[0]
+            group.append(vector)
+            total += int((self.indptr[ids + 1] - self.indptr[ids]).sum())
+            if total >= BATCH_POSTINGS or i == len(vectors) - 1:
+                yield from self._group_scores(group)
+                group, total = [], 0
+
+    def _group_scores(self, vectors) -> np.ndarray:
+        dots = np.zeros((len(vectors), self.n_docs))
+        ids = np.concatenate([v[0] for v in vectors])
+        if len(ids):
+            weights = np.concatenate([v[1] for v in vectors])
+            q_row = np.repeat(np.arange(len(vectors)), [len(v[0]) for v in vectors])
+            pos, lengths, contrib = self._postings(ids, weights)
+            # One flat (query, document) accumulator for the whole group
+            cells = np.repeat(q_row, lengths) * self.n_docs + self.doc_idx[pos]
+            dots = np.bincount(cells, weights=contrib, minlength=dots.size).reshape(dots.shape)
+        denom = np.asarray([v[2] for v in vectors])[:, None] * self.norms[None, :]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+    def scores(self, dots: np.ndarray, q_norm: float) -> np.ndarray:
+        denom = q_norm * self.norms
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+    def top_k(self, scores: np.ndarray, k: int) -> List[Tuple[float, Hashable]]:
+        if k <= 0 or not self.n_docs:
+            return []
+        # Only documents sharing a term with the query can score above zero
+        cand = np.flatnonzero(scores)
+        if len(cand) > k:
+            kth = np.partition(scores[cand], len(cand) - k)[len(cand) - k]
+            cand = cand[scores[cand] >= kth]
+        # Descending by (score, doc index), as a full tuple sort would order them
+        order = cand[np.lexsort((cand, scores[cand]))[::-1][:k]].tolist()
+        if len(order) < k:
+            # Zero-score documents fill the remaining slots, highest index first
+            zeros = np.flatnonzero(scores == 0)
+            order.extend(zeros[::-1][:k - len(order)].tolist())
+        return [(float(scores[i]), self.doc_ids[i]) for i in order]
+
+    def search(self, q_tf: Counter, k: int) -> List[Tuple[float, Hashable]]:
+        ids, weights, q_norm = self.query_vector(q_tf)
+        return self.top_k(self.scores(self.dots(ids, weights), q_norm), k)
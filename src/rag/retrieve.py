@@ -1,6 +1,10 @@
-from typing import List
+from typing import Dict, List, Tuple
+import threading
 
-# Minimal citation registry. Replace with FAISS-backed retrieval later.
+from src.rag import hybrid
+
+# Citation keys used by the rule packs and their human-readable labels. Each key is
+# grounded in the best-matching reference (and passage, when the dense index is available).
 CITATION_REGISTRY = {
     "companies_regulations_formation": "[CR2020] Companies Regulations 2020 — Formation & Registration documents",
     "companies_registrations_registered_office": "[CR2020-RO] Companies Regulations 2020 — Registered Office in ADGM",
@@ -10,7 +14,63 @@ CITATION_REGISTRY = {
     "employment_standard_template": "[TEMP2025] ADGM Standard Employment Contract Template (2025)",
     "adgm_courts": "[COURTS] ADGM Courts jurisdiction guidance",
 }
+SNIPPET_CHARS = 160
+
+_cited: Dict[str, str] = {}
+_cited_version = None
+_lock = threading.Lock()
+_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_tuples_version = None
+
+
+def citation_query(key: str) -> str:
+    """Search text for a citation key: its registry label without the tag, or the key's words."""
+    label = CITATION_REGISTRY.get(key)
+    return label.split("] ", 1)[-1] if label else key.replace("_", " ")
+
+
+def _snippet(text: str) -> str:
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def resolve_citations(keys: List[str]) -> None:
+    """Ground every not-yet-cited key in one batched hybrid search."""
+    global _cited_version
+    with _lock:
+        if _cited_version != hybrid.index_version():
+            _cited.clear()
+        misses = list(dict.fromkeys(k for k in keys if k not in _cited))
+        if not misses:
+            return
+        if not _cited:
+            # First lookup in this process: resolve the whole registry in the same batch
+            misses += [k for k in CITATION_REGISTRY if k not in misses]
+        hits = hybrid.search_many([citation_query(k) for k in misses], k=1)
+        _cited_version = hybrid.index_version()
+        for key, found in zip(misses, hits):
+            label = CITATION_REGISTRY.get(key, key)
+            if found:
+                top = found[0]
+                label = f"{label} — {top.source}"
+                if top.passage:
+                    label += f": \"{_snippet(top.passage)}\""
+            _cited[key] = label
 
 
 def cite_rules(keys: List[str]) -> List[str]:
-    return [CITATION_REGISTRY.get(k, k) for k in keys]
+    if _cited_version != hybrid.index_version() or any(k not in _cited for k in keys):
+        resolve_citations(keys)
+    return [_cited.get(k, CITATION_REGISTRY.get(k, k)) for k in keys]
+
+
+def citation_tuple(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """`cite_rules(keys)` as a tuple memoised per key tuple, shared by every issue that cites it."""
+    global _tuples_version
+    version = hybrid.index_version()
+    if version != _tuples_version:
+        _tuples.clear()
+        _tuples_version = version
+    found = _tuples.get(keys)
+    if found is None:
+        found = _tuples[keys] = tuple(cite_rules(list(keys)))
+    return found
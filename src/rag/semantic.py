@@ -0,0 +1,304 @@
+"""Dense passage retrieval over references/ backed by a FAISS index file.
+
+Passages produced by `src.rag.ingest` are embedded with a locally cached
+sentence-transformers model on CPU and stored as a FAISS inner-product index
+(one int64 id per passage) plus a JSON sidecar holding the passages and the
+per-file manifest under cache/rag. Nothing is loaded until the first query,
+and queries never wait for ingestion: changed files are picked up by a
+background ingest pass.
+
+`ADGM_DENSE_INDEX` selects how vectors are stored: exact float32 ("flat"),
+int8 scalar quantization ("sq8", 4x smaller) or product quantization ("pq",
+one byte per 8 dimensions). The index file is memory-mapped read-only, so
+every worker process shares one copy of the codes through the page cache.
+`benchmarks/bench_vector_store.py` reports recall@k of each against flat.
+
+Build (and, once, download the model) ahead of time with:
+    python -m src.rag.ingest --download
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+
+from src.core.cache import CACHE_DIR
+from src.rag.simple_retriever import SYNC_INTERVAL
+
+MODEL_NAME = os.environ.get("ADGM_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Where the embedding model is cached; None means the Hugging Face default cache
+MODEL_CACHE = os.environ.get("ADGM_EMBED_CACHE") or None
+INDEX_PATH = os.path.join(CACHE_DIR, "rag", "references_dense.faiss")
+META_PATH = os.path.join(CACHE_DIR, "rag", "references_dense.json")
+INDEX_FORMAT = 2
+EMBED_BATCH = 64
+INDEX_KINDS = ("flat", "sq8", "pq")
+INDEX_KIND = os.environ.get("ADGM_DENSE_INDEX", "flat").lower()
+# faiss's own recommendation for training 256 PQ centroids; smaller corpora use sq8
+PQ_MIN_TRAIN = 39 * 256
+
+
+class Passage(NamedTuple):
+    source: str
+    text: str
+    score: float
+
+
+_model = None
+_model_error: Optional[str] = None
+_model_lock = threading.Lock()
+
+
+def get_model(allow_download: bool = False):
+    """The embedding model on CPU, loaded once; None when it is not available offline."""
+    global _model, _model_error
+    if _model is not None or (_model_error and not allow_download):
+        return _model
+    with _model_lock:
+        if _model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME, device="cpu", cache_folder=MODEL_CACHE,
+                                             local_files_only=not allow_download)
+                _model_error = None
+            except Exception as e:
+                _model_error = f"Embedding model unavailable ({MODEL_NAME}): {e}"
+                print(_model_error)
+    return _model
+
+
+def model_error() -> Optional[str]:
+    return _model_error
+
+
+def encode(texts: List[str], model=None):
+    """L2-normalised float32 embeddings of `texts`, encoded in batches."""
+    import numpy as np
+    if model is None:
+        model = get_model()
+    vectors = model.encode(texts, batch_size=EMBED_BATCH, convert_to_numpy=True,
+                           normalize_embeddings=True, show_progress_bar=False)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def pq_subquantizers(dim: int) -> int:
+    """Sub-quantizer count for PQ: about 8 dimensions per byte, dividing `dim` exactly."""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def new_index(kind: str, dim: int, train=None):
+    """An empty id-mapped inner-product index of `kind`, trained on `train` vectors when it needs it."""
+    import faiss
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown dense index kind {kind!r}; expected one of {', '.join(INDEX_KINDS)}")
+    if kind == "pq" and (train is None or len(train) < PQ_MIN_TRAIN):
+        print(f"Too few passages to train a PQ index ({0 if train is None else len(train)} < {PQ_MIN_TRAIN}); "
+              f"using sq8 until a full rebuild")
+        kind = "sq8"
+    spec = {"flat": "Flat", "sq8": "SQ8", "pq": f"PQ{pq_subquantizers(dim)}x8"}[kind]
+    index = faiss.index_factory(dim, f"IDMap2,{spec}", faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(train)
+    return index
+
+
+def read_index(path: str, mapped: bool = True):
+    """(index, mapped): the codes are memory-mapped read-only when this faiss build supports it."""
+    import faiss
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) if mapped else None
+    if flag is None:
+        return faiss.read_index(path), False
+    return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY), True
+
+
+class SemanticIndex:
+    """A FAISS inner-product index of reference passages, updated file by file.
+
+    `files` is the ingestion manifest: for every indexed file its content hash,
+    (mtime_ns, size) signature and the ids of its passages. Only the ingest
+    stage mutates the index, on a private in-memory copy that replaces the
+    mapped file when saved; searches hold the lock just for the FAISS lookup.
+    """
+
+    def __init__(self, index_path: str = INDEX_PATH, meta_path: str = META_PATH):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.index = None
+        self.passages: Dict[int, Tuple[str, str]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.next_id = 0
+        self.version = ""
+        self._mapped = False
+        self._stamp: Optional[int] = None
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def load(self) -> bool:
+        """Read the index and sidecar from disk; False (leaving it empty) when absent or built differently."""
+        try:
+            stamp = os.stat(self.meta_path).st_mtime_ns
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format") != INDEX_FORMAT or meta.get("model") != MODEL_NAME \
+                    or meta.get("kind", "flat") != INDEX_KIND:
+                return False
+            index, mapped = read_index(self.index_path)
+        except (OSError, ValueError, RuntimeError):
+            return False
+        if index.ntotal != len(meta["passages"]):
+            # Caught between another process replacing the index and its sidecar
+            return False
+        with self._lock:
+            self.index, self._mapped, self._stamp = index, mapped, stamp
+            self.passages = {int(i): tuple(p) for i, p in meta["passages"].items()}
+            self.files = meta["files"]
+            self.next_id = meta["next_id"]
+            self.version = meta["version"]
+        return True
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load()
+                    self._loaded = True
+
+    def reload_if_changed(self) -> bool:
+        """Pick up an index that another process saved since this one was loaded."""
+        try:
+            stamp = os.stat(self.meta_path).st_mtime_ns
+        except OSError:
+            return False
+        return stamp != self._stamp and self.load()
+
+    def apply(self, removed: Sequence[str], added: Sequence[Tuple[str, Dict[str, Any], List[str], Any]],
+              dim: int, reset: bool = False) -> None:
+        """Drop the passages of `removed` files and add (name, manifest entry, chunks, vectors) files.
+
+        Embeddings are computed by the caller beforehand, so the lock is held only
+        for the id bookkeeping and the in-memory FAISS update. `reset` starts a new
+        index, retraining the quantizer on the added vectors.
+        """
+        import numpy as np
+        fresh = [vectors for _, _, chunks, vectors in added if chunks]
+        with self._lock:
+            if reset or (self.index is not None and self.index.d != dim):
+                self.index, self._mapped = None, False
+                self.passages, self.files, self.next_id = {}, {}, 0
+            if self._mapped:
+                # Mapped codes are read-only: update a private copy until save() maps the new file
+                self.index, self._mapped = read_index(self.index_path, mapped=False)
+            stale = dict.fromkeys(name for name in [*removed, *(a[0] for a in added)] if name in self.files)
+            drop = [i for name in stale for i in self.files.pop(name)["ids"]]
+            if drop:
+                if self.index is not None:
+                    self.index.remove_ids(np.asarray(drop, dtype=np.int64))
+                for i in drop:
+                    self.passages.pop(i, None)
+            if self.index is None and fresh:
+                self.index = new_index(INDEX_KIND, dim, np.vstack(fresh))
+            for name, entry, chunks, vectors in added:
+                ids = list(range(self.next_id, self.next_id + len(chunks)))
+                self.next_id += len(chunks)
+                if ids:
+                    self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+                self.passages.update((i, (name, chunk)) for i, chunk in zip(ids, chunks))
+                self.files[name] = dict(entry, ids=ids)
+            self.version = f"{time.time_ns():x}"
+
+    def touch(self, name: str, entry: Dict[str, Any]) -> None:
+        """Record a new signature for a file whose content (hash) did not change."""
+        with self._lock:
+            if name in self.files:
+                self.files[name].update(entry)
+
+    def save(self) -> None:
+        """Write the index and sidecar atomically, then serve from the mapped file."""
+        import faiss
+        with self._lock:
+            if self.index is None:
+                return
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            index_tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            faiss.write_index(self.index, index_tmp)
+            meta = {
+                "format": INDEX_FORMAT,
+                "model": MODEL_NAME,
+                "kind": INDEX_KIND,
+                "version": self.version,
+                "next_id": self.next_id,
+                "files": {name: dict(entry) for name, entry in self.files.items()},
+                "passages": {str(i): list(p) for i, p in self.passages.items()},
+            }
+        meta_tmp = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(index_tmp, self.index_path)
+        os.replace(meta_tmp, self.meta_path)
+        index, mapped = read_index(self.index_path)
+        with self._lock:
+            if self.index.ntotal == index.ntotal:
+                self.index, self._mapped = index, mapped
+            self._stamp = os.stat(self.meta_path).st_mtime_ns
+
+    def search_many(self, queries: List[str], k: int = 3) -> List[List[Passage]]:
+        """Top-k passages per query; all queries are embedded in one batch."""
+        if not queries or get_model() is None:
+            return [[] for _ in queries]
+        self.ensure_loaded()
+        self._schedule_refresh()
+        if not self.passages or self.index is None:
+            return [[] for _ in queries]
+        vectors = encode(list(queries))
+        with self._lock:
+            # Search and passage lookup must see the same state
+            scores, ids = self.index.search(vectors, min(k, len(self.passages)))
+            found = [[self.passages.get(int(i)) for i in row] for row in ids]
+        return [
+            [Passage(p[0], p[1], float(s)) for s, p in zip(row_s, row_p) if p is not None]
+            for row_s, row_p in zip(scores, found)
+        ]
+
+    def _schedule_refresh(self) -> None:
+        # Changed reference files are ingested in the background, never on the query path
+        now = time.monotonic()
+        if now - self._last_refresh >= SYNC_INTERVAL:
+            self._last_refresh = now
+            from src.rag import ingest
+            ingest.schedule()
+
+
+_index: Optional[SemanticIndex] = None
+
+
+def get_index() -> SemanticIndex:
+    global _index
+    if _index is None:
+        _index = SemanticIndex()
+    return _index
+
+
+def search_many(queries: List[str], k: int = 3) -> List[List[Passage]]:
+    try:
+        return get_index().search_many(queries, k)
+    except ImportError:
+        # faiss or numpy missing: dense retrieval is simply unavailable
+        return [[] for _ in queries]
+
+
+def search(query: str, k: int = 3) -> List[Passage]:
+    return search_many([query], k)[0]
+
+
+def index_version() -> str:
+    """Changes whenever the loaded passage index is updated."""
+    return _index.version if _index is not None else ""
@@ -1,64 +1,80 @@
 import os
-import math
-from typing import List, Tuple
-from collections import Counter
+import threading
+import time
+from typing import List, Optional
+
+from src.core.cache import CACHE_DIR
+from src.rag.lexical import LexicalIndex
 
 REF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'references')
+INDEX_PATH = os.path.join(CACHE_DIR, 'rag', 'references_lexical.pickle')
+# Seconds between checks of the index file for a newer ingest, and between
+# requests for a background ingest pass
+SYNC_INTERVAL = float(os.environ.get('ADGM_RAG_SYNC_INTERVAL', '2'))
+
+_index: Optional[LexicalIndex] = None
+_stamp: Optional[int] = None
+_last_check = 0.0
+_last_refresh = 0.0
+_lock = threading.Lock()
+
+
+def load_index() -> LexicalIndex:
+    """The index as last written by `src.rag.ingest`, reloaded when another process rewrites it.
 
+    Never reads reference files; keeping the postings in step with references/
+    is the ingest pass's job.
+    """
+    global _index, _stamp, _last_check
+    now = time.monotonic()
+    if _index is not None and now - _last_check < SYNC_INTERVAL:
+        return _index
+    with _lock:
+        _last_check = now
+        try:
+            stamp = os.stat(INDEX_PATH).st_mtime_ns
+        except OSError:
+            stamp = None
+        if _index is None or (stamp is not None and stamp != _stamp):
+            loaded = LexicalIndex.load(INDEX_PATH) if stamp is not None else None
+            _index = loaded or _index or LexicalIndex()
+            _stamp = stamp
+        return _index
 
-def _tokenize(text: str) -> List[str]:
-    return [t.lower() for t in ''.join(ch if ch.isalnum() else ' ' for ch in text).split() if t]
 
+def save_index(index: LexicalIndex) -> None:
+    """Serve `index` from now on and write it to INDEX_PATH for other processes."""
+    global _index, _stamp
+    with _lock:
+        _index = index
+        try:
+            index.save(INDEX_PATH)
+            _stamp = os.stat(INDEX_PATH).st_mtime_ns
+        except OSError:
+            pass
 
-def _load_corpus() -> List[Tuple[str, str]]:
-    docs: List[Tuple[str, str]] = []
-    if not os.path.isdir(REF_DIR):
-        return docs
-    for name in os.listdir(REF_DIR):
-        path = os.path.join(REF_DIR, name)
-        if os.path.isfile(path) and name.lower().endswith('.txt'):
-            try:
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    docs.append((name, f.read()))
-            except Exception:
-                continue
-    return docs
+
+def get_index() -> LexicalIndex:
+    """`load_index` for queries; changed references are ingested in the background, never here."""
+    global _last_refresh
+    now = time.monotonic()
+    if now - _last_refresh >= SYNC_INTERVAL:
+        _last_refresh = now
+        from src.rag import ingest
+        ingest.schedule()
+    return load_index()
 
 
 def retrieve(query: str, k: int = 3) -> List[str]:
-    corpus = _load_corpus()
-    if not corpus:
+    index = get_index()
+    if not len(index):
         return []
-    q_tokens = _tokenize(query)
-    q_tf = Counter(q_tokens)
-    # Build DF
-    dfs = Counter()
-    doc_tfs = []
-    for name, text in corpus:
-        tokens = _tokenize(text)
-        tf = Counter(tokens)
-        doc_tfs.append((name, tf))
-        for term in set(tokens):
-            dfs[term] += 1
-    N = len(corpus)
-    # Score
-    scores = []
-    for (name, tf) in doc_tfs:
-        num = 0.0
-        dq = 0.0
-        dd = 0.0
-        for term in set(q_tokens + list(tf.keys())):
-            idf = math.log((N + 1) / (1 + dfs.get(term, 0))) + 1.0
-            q_w = q_tf.get(term, 0) * idf
-            d_w = tf.get(term, 0) * idf
-            num += q_w * d_w
-            dq += q_w * q_w
-            dd += d_w * d_w
-        denom = (dq ** 0.5) * (dd ** 0.5)
-        score = (num / denom) if denom else 0.0
-        scores.append((score, name))
-    scores.sort(reverse=True)
-    out = []
-    for score, name in scores[:k]:
-        out.append(f"[REF] {name}")
-    return out
+    return [f"[REF] {name}" for _, name in index.search(query, k)]
+
+
+def retrieve_many(queries: List[str], k: int = 3) -> List[List[str]]:
+    """`retrieve` for a batch of queries (e.g. every issue in a bundle) in one scoring pass."""
+    index = get_index()
+    if not len(index):
+        return [[] for _ in queries]
+    return [[f"[REF] {name}" for _, name in hits] for hits in index.search_many(list(queries), k)]
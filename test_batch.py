@@ -0,0 +1,62 @@
+"""
+Batch runs resume where they left off: bundles recorded in the checkpoint are
+skipped until one of their files changes.
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import pytest
+
+from src import batch
+from src.rag import ingest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    # Reference ingestion is not under test; keep it from reading references/
+    monkeypatch.setattr(ingest, "run_once", lambda **kwargs: None)
+    monkeypatch.setattr(ingest, "schedule", lambda: None)
+    docs = sorted(glob.glob(os.path.join(ROOT, "references", "*.docx")))
+    root = tmp_path / "archive"
+    for bundle, picked in (("client-a", docs[:2]), ("client-b/2024", docs[2:3]), ("client-c", docs[3:])):
+        os.makedirs(root / bundle)
+        for path in picked:
+            shutil.copy(path, root / bundle)
+    return root
+
+
+def results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_skips_finished_bundles(archive, tmp_path):
+    output, checkpoint = str(tmp_path / "out.jsonl"), str(tmp_path / "checkpoint.json")
+
+    stats = batch.run(str(archive), output, checkpoint, workers=1)
+    assert (stats["bundles"], stats["skipped"], stats["failed"]) == (3, 0, 0)
+    first = results(output)
+    assert sorted(r["bundle"] for r in first) == ["client-a", "client-b/2024", "client-c"]
+
+    stats = batch.run(str(archive), output, checkpoint, resume=True, workers=1)
+    assert (stats["bundles"], stats["skipped"]) == (0, 3)
+    assert results(output) == first
+
+    # An edited bundle is scored again and appended; the others stay skipped
+    edited = next((archive / "client-b" / "2024").iterdir())
+    st = os.stat(edited)
+    os.utime(edited, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    stats = batch.run(str(archive), output, checkpoint, resume=True, workers=1)
+    assert (stats["bundles"], stats["skipped"]) == (1, 2)
+    lines = results(output)
+    assert lines[:3] == first and lines[3]["bundle"] == "client-b/2024"
+
+    # Without --resume everything is scored from scratch
+    stats = batch.run(str(archive), output, checkpoint, workers=1)
+    assert (stats["bundles"], stats["skipped"]) == (3, 0)
+    assert len(results(output)) == 3
@@ -0,0 +1,93 @@
+"""
+The per-document analysis cache: memory and disk tiers, rule-version
+invalidation and pruning of the disk tier.
+"""
+
+import os
+import time
+
+import pytest
+
+from src.core import cache
+from src.core.cache import AnalysisCache
+
+
+def digest(i):
+    return f"{i:02x}" + "0" * 62
+
+
+@pytest.fixture
+def version(monkeypatch):
+    current = {"version": "rules-a"}
+    monkeypatch.setattr(cache, "rules_version", lambda: current["version"])
+    # Writes only prune when a test asks for it
+    monkeypatch.setattr(cache, "PRUNE_INTERVAL", float("inf"))
+    return current
+
+
+def files(directory):
+    return sorted(name for _, _, names in os.walk(directory) for name in names)
+
+
+def test_memory_and_disk_tiers(tmp_path, version):
+    store = AnalysisCache(str(tmp_path))
+    store.update(digest(1), types={"a.docx": "Articles of Association"})
+    store.update(digest(1), types={"b.docx": "UBO Declaration"}, paragraphs=["x"])
+    expected = {"types": {"a.docx": "Articles of Association", "b.docx": "UBO Declaration"}, "paragraphs": ["x"]}
+    assert store.get(digest(1)) == expected
+
+    # Another process (or a restart) reads it back from disk
+    assert AnalysisCache(str(tmp_path)).get(digest(1)) == expected
+    assert files(tmp_path) == [f"{digest(1)}-rules-a.json"]
+
+    # A rule change makes old entries unreachable
+    version["version"] = "rules-b"
+    assert store.get(digest(1)) is None
+    assert AnalysisCache(str(tmp_path)).get(digest(1)) is None
+
+
+def test_prune_drops_other_versions_stale_temp_files_and_least_recent_entries(tmp_path, version):
+    store = AnalysisCache(str(tmp_path), max_entries=2)
+    old = time.time() - 7200
+    for i in range(6):
+        store.update(digest(i), paragraphs=["x" * 500])
+        path = store._path(store.key(digest(i)))
+        os.utime(path, (old + i, old + i))
+    os.makedirs(tmp_path / "ff", exist_ok=True)
+    (tmp_path / "ff" / f"{digest(255)}-rules-old.json").write_text("{}")
+    stale = tmp_path / "ff" / "abandoned.json.1.2.tmp"
+    stale.write_text("{")
+    os.utime(stale, (old, old))
+    live = tmp_path / "ff" / "writing.json.3.4.tmp"
+    live.write_text("{")
+
+    # Reading from disk makes entry 1 recent; entries 4 and 5 are still in this process's memory
+    store.clear()
+    store.get(digest(1))
+    store.update(digest(4), types={})
+    store.update(digest(5), types={})
+    for i in (4, 5):
+        os.utime(store._path(store.key(digest(i))), (old, old))
+    survivors = [store._path(store.key(digest(i))) for i in (1, 4, 5)] + [str(live)]
+    store.max_bytes = sum(os.path.getsize(p) for p in survivors)
+
+    stats = store.prune()
+    assert files(tmp_path) == sorted([f"{digest(i)}-rules-a.json" for i in (1, 4, 5)] + ["writing.json.3.4.tmp"])
+    assert stats["removed"] == 5
+
+    # After a rule change every entry written so far goes
+    version["version"] = "rules-b"
+    store.prune()
+    assert files(tmp_path) == ["writing.json.3.4.tmp"]
+
+
+def test_writes_prune_once_the_interval_has_passed(tmp_path, version, monkeypatch):
+    store = AnalysisCache(str(tmp_path))
+    store.update(digest(1), types={})
+    version["version"] = "rules-b"
+    store.update(digest(2), types={})
+    assert len(files(tmp_path)) == 2
+
+    monkeypatch.setattr(cache, "PRUNE_INTERVAL", 0.0)
+    store.update(digest(3), types={})
+    assert files(tmp_path) == [f"{digest(i)}-rules-b.json" for i in (2, 3)]
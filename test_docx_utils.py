@@ -0,0 +1,122 @@
+"""
+The streaming extractor against python-docx, and the comment writer's output
+package on the reference templates.
+"""
+
+import glob
+import os
+import pickle
+import zipfile
+from io import BytesIO
+
+import pytest
+from docx import Document
+from lxml import etree
+
+from src.core.docx_utils import (
+    COMMENT_AUTHOR, W_NS, W_URI, insert_comments_and_return_bytes, iter_docx_blocks, parse_docx,
+)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REFERENCE_DOCX = sorted(glob.glob(os.path.join(ROOT, "references", "*.docx")))
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def python_docx_blocks(data):
+    """Body paragraphs, then each top-level table cell once, as python-docx reads them."""
+    doc = Document(BytesIO(data))
+    blocks = [("paragraph", p.text) for p in doc.paragraphs]
+    for table in doc.tables:
+        # Merged cells come back once per grid position they cover; holding on to the
+        # elements keeps their lxml proxies (and so identity) stable
+        seen = set()
+        for row in table.rows:
+            for cell in row.cells:
+                if cell._tc not in seen:
+                    seen.add(cell._tc)
+                    blocks.append(("cell", cell.text))
+    return blocks
+
+
+@pytest.mark.parametrize("path", REFERENCE_DOCX, ids=os.path.basename)
+def test_iter_docx_blocks_matches_python_docx(path):
+    data = read(path)
+    blocks = list(iter_docx_blocks(data))
+    # Paragraphs are streamed in body order and cells after them in the parsed document
+    expected = python_docx_blocks(data)
+    assert [b for b in blocks if b[0] == "paragraph"] == [b for b in expected if b[0] == "paragraph"]
+    assert [b for b in blocks if b[0] == "cell"] == [b for b in expected if b[0] == "cell"]
+
+
+def test_parsed_document_pickles_without_its_python_docx_tree():
+    parsed = parse_docx(read(REFERENCE_DOCX[0]))
+    assert parsed.document is not None
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert (restored.paragraphs, restored.cells, restored.offsets) == (parsed.paragraphs, parsed.cells, parsed.offsets)
+    assert len(restored.document.paragraphs) == len(parsed.document.paragraphs)
+
+
+def _comment_text(comment):
+    return "\n".join("".join(t.text or "" for t in p.iter(W_NS + "t")) for p in comment.iter(W_NS + "p"))
+
+
+def _ranges(document_root):
+    """{comment id: text between its range markers} and the ids carrying a reference run."""
+    ranges, inside = {}, set()
+    for el in document_root.iter(W_NS + "commentRangeStart", W_NS + "commentRangeEnd", W_NS + "t"):
+        if el.tag == W_NS + "commentRangeStart":
+            inside.add(el.get(W_NS + "id"))
+            ranges.setdefault(el.get(W_NS + "id"), "")
+        elif el.tag == W_NS + "commentRangeEnd":
+            inside.discard(el.get(W_NS + "id"))
+        else:
+            for cid in inside:
+                ranges[cid] += el.text or ""
+    references = [r.get(W_NS + "id") for r in document_root.iter(W_NS + "commentReference")]
+    return ranges, references
+
+
+@pytest.mark.parametrize("path", REFERENCE_DOCX, ids=os.path.basename)
+def test_comment_round_trip(path):
+    parsed = parse_docx(read(path))
+    blocks = parsed.paragraphs + parsed.cells
+    block = next(i for i, t in enumerate(blocks) if len(t.strip()) > 12)
+    start = len(blocks[block]) - len(blocks[block].lstrip())
+    anchor = blocks[block][start:start + 8]
+    comments = [
+        {"issue": "Located", "severity": "High", "suggestion": "Fix it.", "citations": ["Ref A"],
+         "location": [block, start, start + 12]},
+        {"issue": "Anchored", "location": anchor, "citations": []},
+        {"issue": "Unanchored", "location": None},
+    ]
+    out = insert_comments_and_return_bytes(parsed, comments)
+
+    with zipfile.ZipFile(BytesIO(out)) as zf:
+        assert zf.testzip() is None
+        main = etree.fromstring(zf.read("word/document.xml"))
+        comments_part = etree.fromstring(zf.read("word/comments.xml"))
+        content_types = zf.read("[Content_Types].xml").decode()
+        rels = zf.read("word/_rels/document.xml.rels").decode()
+    assert "/word/comments.xml" in content_types
+    assert "relationships/comments" in rels
+
+    written = comments_part.findall(W_NS + "comment")
+    assert [c.get(W_NS + "author") for c in written] == [COMMENT_AUTHOR] * 3
+    ids = [c.get(W_NS + "id") for c in written]
+    assert len(set(ids)) == 3
+    assert _comment_text(written[0]) == "[High] Located\nSuggestion: Fix it.\nSources: Ref A"
+    assert _comment_text(written[1]) == "[Medium] Anchored"
+
+    ranges, references = _ranges(main)
+    assert sorted(references) == sorted(ids)
+    assert ranges[ids[0]] == blocks[block][start:start + 12]
+    assert ranges[ids[1]].lower() == anchor.lower()
+
+    # The text itself is untouched and Word-compatible readers still open the package
+    assert parse_docx(out).text == parsed.text
+    assert len(Document(BytesIO(out)).paragraphs) == len(parsed.document.paragraphs)
+    assert comments_part.nsmap.get("w") == W_URI
@@ -0,0 +1,88 @@
+"""
+Background jobs: back-pressure, failed stages and both job stores.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import jobs, server
+from src.api.jobs import DONE, FAILED, QUEUED, JobQueue, QueueFull
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return jobs.SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    return jobs.MemoryJobStore()
+
+
+async def run(fn, value):
+    return await fn(value)
+
+
+def test_queue_back_pressure_failures_and_results(store):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def classify(value):
+            await release.wait()
+            if value == "bad":
+                raise ValueError("unreadable bundle")
+            return {"bundle": value, "documents": ["a.docx", "b.docx"]}
+
+        async def validate(value):
+            return dict(value, report={"compliance_score": 92, "issues_found": []})
+
+        queue = JobQueue(store, [("classify", classify), ("validate", validate)], run, workers=1, maxsize=1)
+        queue.start()
+        first = queue.submit("good")
+        await asyncio.sleep(0)  # the runner takes it and blocks in classify
+        second = queue.submit("bad")
+        assert queue.pending() == 1
+        with pytest.raises(QueueFull):
+            queue.submit("one too many")
+        assert store.get(first)["stage"] == "classify"
+        assert store.get(second)["status"] == QUEUED
+
+        release.set()
+        while queue.pending() or store.get(second)["status"] not in (DONE, FAILED):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    done = store.get(first)
+    assert (done["status"], done["stage"], done["error"]) == (DONE, DONE, None)
+    assert done["result"] == {"bundle": "good", "documents": ["a.docx", "b.docx"],
+                              "report": {"compliance_score": 92, "issues_found": []}}
+    failed = store.get(second)
+    assert (failed["status"], failed["stage"], failed["result"]) == (FAILED, "classify", None)
+    assert failed["error"] == "ValueError: unreadable bundle"
+
+
+def test_prune_forgets_only_finished_jobs(store):
+    for job_id in ("done", "failed", "queued"):
+        store.create(job_id)
+    store.update("done", status=DONE, stage=DONE, result={"ok": True})
+    store.update("failed", status=FAILED, error="boom")
+    store.prune(time.time() - 60)
+    assert store.get("done") is not None and store.get("failed") is not None
+
+    store.prune(time.time() + 1)
+    assert store.get("done") is None and store.get("failed") is None
+    assert store.get("queued")["status"] == QUEUED
+
+
+def test_full_queue_answers_429(monkeypatch):
+    full = JobQueue(jobs.MemoryJobStore(), [], run, workers=1, maxsize=1)
+    full._queue = asyncio.Queue(1)
+    full._queue.put_nowait(("waiting", None))
+    monkeypatch.setattr(server, "_jobs", full)
+
+    response = TestClient(server.app).post("/jobs", files={"files": ("a.docx", b"PK", "application/octet-stream")})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,118 @@
+"""
+`LexicalIndex` must rank references exactly like the per-document scorer
+`simple_retriever.retrieve` shipped with, including after incremental updates,
+and retrieval must notice an index another process saved.
+"""
+
+import glob
+import math
+import os
+import random
+from collections import Counter
+
+from src.rag import hybrid, ingest, semantic, simple_retriever
+from src.rag.lexical import LexicalIndex, tokenize
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = [
+    "registered office address in Abu Dhabi Global Market",
+    "governing law ADGM courts jurisdiction",
+    "employment contract minimum salary notice period",
+    "board resolution signature block director",
+    "ultimate beneficial owner declaration",
+    "shareholder shareholder written resolution authorised signatory",
+    "no such words anywhere",
+    "",
+]
+
+
+def legacy_scores(corpus, query, k):
+    """The original scoring loop: cosine over the union of query and document terms, per file."""
+    doc_tfs = [(name, Counter(tokenize(text))) for name, text in corpus]
+    dfs = Counter(term for _, tf in doc_tfs for term in tf)
+    q_tokens = tokenize(query)
+    q_tf = Counter(q_tokens)
+    n = len(doc_tfs)
+    scores = []
+    for name, tf in doc_tfs:
+        num = dq = dd = 0.0
+        for term in set(q_tokens + list(tf.keys())):
+            idf = math.log((n + 1) / (1 + dfs.get(term, 0))) + 1.0
+            q_w = q_tf.get(term, 0) * idf
+            d_w = tf.get(term, 0) * idf
+            num += q_w * d_w
+            dq += q_w * q_w
+            dd += d_w * d_w
+        denom = (dq ** 0.5) * (dd ** 0.5)
+        scores.append(((num / denom) if denom else 0.0, name))
+    scores.sort(reverse=True)
+    return scores[:k]
+
+
+def reference_corpus():
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "references", "*.txt"))):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            corpus.append((os.path.basename(path), f.read()))
+    return corpus
+
+
+def assert_same_ranking(index, corpus, k=5):
+    queries = QUERIES + [" ".join(random.Random(7).sample(tokenize(corpus[0][1]), 4))]
+    batched = index.search_many(queries, k)
+    for query, many in zip(queries, batched):
+        expected = legacy_scores(corpus, query, k)
+        for found in (index.search(query, k), many):
+            assert [name for _, name in found] == [name for _, name in expected], query
+            for (score, _), (legacy, _) in zip(found, expected):
+                assert math.isclose(score, legacy, rel_tol=1e-9, abs_tol=1e-12), query
+
+
+def test_search_matches_legacy_scorer():
+    corpus = reference_corpus()
+    index = LexicalIndex()
+    for name, text in corpus:
+        index.add(name, text)
+    assert_same_ranking(index, corpus)
+
+
+def test_search_matches_legacy_scorer_after_updates():
+    corpus = reference_corpus()
+    index = LexicalIndex()
+    index.sync({name: 1 for name, _ in corpus}, dict(corpus).get)
+
+    # Edit one file, drop another and add a new one
+    edited = (corpus[0][0], corpus[0][1] + " registered office registered office")
+    added = ("zz_new.txt", "Board resolution of the directors, signed by the company secretary.")
+    corpus = [edited] + corpus[2:] + [added]
+    sources = {name: 1 for name, _ in corpus}
+    sources[edited[0]] = 2
+    assert index.sync(sources, dict(corpus).get)
+    assert_same_ranking(index, corpus)
+
+
+def test_hybrid_results_follow_an_index_saved_by_another_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "references_lexical.pickle")
+    monkeypatch.setattr(simple_retriever, "INDEX_PATH", path)
+    monkeypatch.setattr(simple_retriever, "SYNC_INTERVAL", 0.0)
+    monkeypatch.setattr(simple_retriever, "_index", None)
+    monkeypatch.setattr(ingest, "schedule", lambda: None)
+    monkeypatch.setattr(semantic, "search_many", lambda queries, k=3: [[] for _ in queries])
+
+    first = LexicalIndex()
+    first.add("office.txt", "The registered office must be in ADGM.", (1, 1))
+    first.save(path)
+    assert [hit.source for hit in hybrid.search("registered office", 1)] == ["office.txt"]
+
+    # Another process (the ingest CLI, or the API's main process) saves a newer index
+    newer = LexicalIndex()
+    newer.add("office.txt", "Unrelated text.", (2, 1))
+    newer.add("registered.txt", "Registered office: registered office address.", (3, 1))
+    newer.save(path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert LexicalIndex.load(path).version == newer.version != first.version
+    assert [hit.source for hit in hybrid.search("registered office", 1)] == ["registered.txt"]
+    assert hybrid.index_version()[0] == newer.version
@@ -0,0 +1,144 @@
+"""
+The rule pack must raise exactly what the hardcoded checks in validate.py did
+before they moved to src/rulepacks.yaml (citations aside, which are now
+grounded in reference passages).
+"""
+
+import glob
+import os
+import re
+
+import pytest
+
+from src.core.docx_utils import parse_docx
+from src.core.validate import evaluate_checks
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# -- the checks as they were hardcoded ---------------------------------------
+
+def legacy_jurisdiction(text):
+    if re.search(r"uae federal court|mainland|dubai courts|abu dhabi courts", text, re.I):
+        return [("Jurisdiction refers outside ADGM", "High",
+                 "Replace forum with ADGM Courts and ADGM governing law, as applicable.")]
+    return []
+
+
+def legacy_registered_office(text):
+    if not re.search(r"registered\s+office|al maryah|adgm", text, re.I):
+        return [("No ADGM registered office found", "High",
+                 "Add the ADGM registered office address in Abu Dhabi Global Market.")]
+    return []
+
+
+def legacy_signature_block(text):
+    patterns = [r"signed by", r"signature", r"name:\s+", r"date:\s+"]
+    if not any(re.search(p, text, re.I) for p in patterns):
+        return [("Missing signature/date block", "Medium", "Add Name, Title, Signature, Date at the end.")]
+    return []
+
+
+def legacy_governing_law(text):
+    if re.search(r"governing\s+law|law\s+of", text, re.I):
+        if not re.search(r"adgm|abu dhabi global market", text, re.I):
+            return [("Governing law not set to ADGM", "High",
+                     "Set governing law to Abu Dhabi Global Market (ADGM) where appropriate.")]
+    return []
+
+
+def legacy_defined_terms_section(text):
+    if not re.search(r"definitions|interpretation", text, re.I):
+        return [("No Definitions/Interpretation section", "Medium",
+                 "Add a Definitions/Interpretation section to standardize capitalized terms.")]
+    return []
+
+
+def legacy_clause_numbering(text):
+    if not re.search(r"\b\d+\.(?:\d+\.)?\s", text):
+        return [("Clauses not clearly numbered", "Low",
+                 "Number clauses (e.g., 1., 1.1, 1.2) for readability and cross-referencing.")]
+    return []
+
+
+def legacy_signing_authority(text):
+    if not re.search(r"authori[sz]ed\s+signator|director|company secretary", text, re.I):
+        return [("Signing authority not evident", "Medium",
+                 "Identify the authorised signatory (e.g., Director) in the execution block.")]
+    return []
+
+
+def legacy_employment_minimums(text):
+    reqs = {
+        "names": r"employee|employer",
+        "start": r"start date|commencement",
+        "job": r"job title|position",
+        "wages": r"wage|salary|compensation",
+        "pay_period": r"pay period|monthly|weekly",
+        "hours": r"hours of work|working hours",
+        "leave": r"annual leave|vacation|sick leave",
+        "notice": r"notice|termination",
+        "place": r"place of work|remote",
+        "grievance": r"disciplinary|grievance",
+    }
+    return [
+        (f"Employment: missing {key.replace('_', ' ')}",
+         "High" if key in {"wages", "pay_period", "leave", "notice"} else "Medium",
+         f"Add {key.replace('_', ' ')} per Employment Regulations 2024.")
+        for key, pat in reqs.items() if not re.search(pat, text, re.I)
+    ]
+
+
+LEGACY_DOC_CHECKS = {
+    "Articles of Association": [legacy_jurisdiction, legacy_registered_office, legacy_governing_law,
+                                legacy_defined_terms_section, legacy_clause_numbering],
+    "Shareholder Resolution": [legacy_signature_block, legacy_signing_authority],
+    "Board Resolution": [legacy_signature_block, legacy_signing_authority],
+    "Incorporation Application": [legacy_registered_office, legacy_governing_law],
+    "UBO Declaration": [],
+    "Register of Members and Directors": [],
+    "Employment Contract": [legacy_employment_minimums],
+}
+
+
+def legacy_issues(dtype, text):
+    return [found for check in LEGACY_DOC_CHECKS[dtype] for found in check(text)]
+
+
+# -- texts exercising both sides of every pattern ----------------------------
+
+SNIPPETS = [
+    "",
+    "This Agreement is subject to the jurisdiction of the Dubai Courts.",
+    "Disputes go to the UAE Federal Court; the governing law is the law of the mainland.",
+    "Governing Law: the laws of England. 1. Definitions\n1.1 In these Articles...",
+    "GOVERNING LAW. This deed is governed by the law of Abu Dhabi Global Market.",
+    "Registered   Office: Al Maryah Island, ADGM Square.",
+    "SIGNED BY the Director\nName:  Jane Doe\nDate:  1 March 2024",
+    "Authorised signatory for and on behalf of the Company Secretary",
+    "Interpretation 2.1. words importing the singular",
+    "Employee: A. Smith. Employer: B Ltd. Start date 1 May. Job title: Analyst. Monthly salary "
+    "AED 10,000. Working hours 9-5. Annual leave 22 days. Notice period one month. Place of work "
+    "Abu Dhabi. Grievance procedure applies.",
+    "Commencement: today. Position: clerk. Wage paid weekly. Hours of work 40. Sick leave. "
+    "Termination on notice. Remote. Disciplinary rules.",
+    "İstanbul office, authorized signator, ΣIGNATURE",
+]
+
+
+def reference_texts():
+    texts = list(SNIPPETS)
+    for path in sorted(glob.glob(os.path.join(ROOT, "references", "*.txt"))):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    for path in sorted(glob.glob(os.path.join(ROOT, "references", "*.docx"))):
+        with open(path, "rb") as f:
+            texts.append(parse_docx(f.read()).text)
+    return texts
+
+
+@pytest.mark.parametrize("dtype", sorted(LEGACY_DOC_CHECKS))
+def test_rule_pack_matches_legacy_checks(dtype):
+    for text in reference_texts():
+        found = [(it.issue, it.severity, it.suggestion) for it in evaluate_checks(dtype, text)]
+        assert found == legacy_issues(dtype, text), text[:80]
@@ -66,6 +66,8 @@ def test_file_structure():
         'requirements.txt',
         'src/core/classify.py',
         'src/core/validate.py',
+        'src/core/rules.py',
+        'src/rulepacks.yaml',
         'src/core/report.py',
         'src/rag/retrieve.py',
         'references/adgm_courts_overview.txt'
@@ -0,0 +1,53 @@
+"""
+Bundle validation: serial and parallel runs agree, and where findings are reported.
+"""
+
+import glob
+import os
+from io import BytesIO
+
+from docx import Document
+
+from src.core.classify import detect_process_and_types
+from src.core.html_report import build_html_report
+from src.core.validate import analyze_bundle
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_parallel_analysis_matches_serial():
+    files = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, "references", "*.docx"))):
+        with open(path, "rb") as f:
+            files[os.path.basename(path)] = f.read()
+    reports = []
+    for workers in (1, 2):
+        info = detect_process_and_types(files, use_cache=False, workers=workers)
+        reports.append((info["process"], info["documents"], analyze_bundle(info, use_cache=False, workers=workers)))
+    assert reports[0] == reports[1]
+
+
+def articles_with_table() -> bytes:
+    doc = Document()
+    doc.add_paragraph("ARTICLES OF ASSOCIATION")
+    doc.add_paragraph("1. Definitions and interpretation. The registered office is in ADGM.")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Forum"
+    table.cell(0, 1).text = "Disputes go to the Dubai Courts."
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def test_findings_in_table_cells_are_reported_as_cells():
+    info = detect_process_and_types({"articles_of_association.docx": articles_with_table()}, use_cache=False)
+    # With the parsed documents (app) and with only the classified metadata (API jobs)
+    without_parsed = {k: v for k, v in info.items() if k != "parsed"}
+    for proc_info in (info, without_parsed):
+        report = analyze_bundle(proc_info, use_cache=False)
+        located = [it for it in report["issues_found"] if it["location"]]
+        assert [it["issue"] for it in located] == ["Jurisdiction refers outside ADGM"]
+        block, start, end = located[0]["location"]
+        assert report["paragraph_counts"] == {"articles_of_association.docx": 2}
+        assert block == 3 and (start, end) == (19, 31)
+        assert "'>cell 2</span>" in build_html_report(report)